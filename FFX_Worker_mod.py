@@ -4,21 +4,18 @@ import csv
 import os
 import json
 import struct
-import re
-from Worker_Data import ebp_patcher
+from Worker_Data import ebp_patcher, ebp_core
 
 # --- CONSTANTS ---
 WINDOW_WIDTH = 1350
 WINDOW_HEIGHT = 950
-NUM_ROWS = 24
+NUM_ROWS = ebp_core.NUM_ROWS
 CSV_FILENAME = r"Worker_Data\ebpcommands.csv"
+PRINT_METRICS = False # Print the timings of every add to the console (hooks get them either way)
 
 # --- GLOBAL STORAGE ---
 k = "" 
 
-# --- OBJECT GENERATION SETTINGS ---
-OBJECT_TOTAL_SIZE = 500  
-
 # Folder Paths
 BASE_DIR = "Worker_Data"
 WORKER_DIR = os.path.join(BASE_DIR, "Worker")
@@ -34,11 +31,11 @@ class RowWidget:
     """
     Row: [Dropdown] | [xOffset] | [Text Entry] | [Command Data] | [Quick Input]
     """
-    def __init__(self, parent, row_index, update_callback, focus_neighbor_callback, command_map, quick_input_data):
+    def __init__(self, parent, row_index, update_callback, focus_neighbor_callback, command_matcher, quick_input_data):
         self.row_index = row_index
         self.update_callback = update_callback
         self.focus_neighbor = focus_neighbor_callback
-        self.command_map = command_map
+        self.command_matcher = command_matcher
         self.quick_input_map = quick_input_data['map']
         
         self.frame = tk.Frame(parent, bg="#f0f0f0")
@@ -103,7 +100,7 @@ class RowWidget:
         self.entry.bind("<Return>", lambda e: self.focus_neighbor(self.row_index, 1))
 
     def _on_combo_change(self, event):
-        self.update_callback()
+        self.update_callback(self.row_index)
 
     def _on_quick_select(self, event):
         label = self.quick_combo.get()
@@ -114,23 +111,12 @@ class RowWidget:
             self.entry.focus_set()
 
     def _on_text_change(self, *args):
-        text_content = self.text_var.get().lower()
-        found_value = ""
-        if self.command_map:
-            sorted_keys = sorted(self.command_map.keys(), key=len, reverse=True)
-            for key in sorted_keys:
-                if key.lower() in text_content:
-                    found_value = self.command_map[key]
-                    break
-        self.cmd_result_var.set(found_value)
-        self.update_callback()
+        # Annotation and offsets are refreshed by the app's scheduler
+        self.update_callback(self.row_index)
 
-    def get_text_length(self):
-        raw_text = self.text_var.get().replace(" ", "")
-        length = len(raw_text)
-        if length == 0:
-            return 0
-        return (length + 1) // 2
+    def update_annotation(self):
+        found_value = self.command_matcher.lookup(self.text_var.get())
+        self.cmd_result_var.set(found_value)
 
     def set_display_count(self, count):
         num_bytes = max(2, (count.bit_length() + 7) // 8)
@@ -158,15 +144,16 @@ class DataEntryApp:
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         
         self._ensure_directories()
-        self.command_map, self.quick_input_data = self.load_csv_data()
-        self.hex_codes_for_parsing = []
-        self._load_parsing_data()
+        self.commands = self.load_csv_data()
+        self.quick_input_data = self.commands.quick_input
+        self.command_matcher = self.commands.matcher
+        self.decode_cache = ebp_core.DecodeCache()
         
-        self.fields = ["INIT", "MAIN", "TALK", "SCOUT", "CROSS", "TOUCH", "E06", "E07"]
+        self.fields = list(ebp_core.FIELDS)
         
-        self.data_store = {}
-        for field in self.fields:
-            self.data_store[field] = [{"c1": "", "text": ""} for _ in range(NUM_ROWS)]
+        self.data_store = ebp_core.empty_data_store(self.fields)
+        self.offsets = ebp_core.OffsetIndex(self.fields)
+        self.offsets.load_store(self.data_store)
 
         # --- UPDATE STATE ---
         self.target_file_path = None # internal usage for update
@@ -177,6 +164,11 @@ class DataEntryApp:
         self.rows = []
         self.nav_buttons = {}
 
+        # --- REFRESH SCHEDULER STATE ---
+        self._refresh_job = None
+        self._dirty_rows = set()
+        self._dirty_full = False
+
         self.main_container = tk.Frame(self.root, bg="#d9d9d9")
         self.main_container.pack(fill="both", expand=True, padx=OUTER_MARGIN, pady=OUTER_MARGIN)
 
@@ -191,44 +183,15 @@ class DataEntryApp:
         os.makedirs(WORKER_DIR, exist_ok=True)
         os.makedirs(ENTRY_DIR, exist_ok=True)
 
-    def _load_parsing_data(self):
-        self.hex_codes_for_parsing = []
-        if os.path.exists(CSV_FILENAME):
-            try:
-                with open(CSV_FILENAME, 'r', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    for row in reader:
-                        if len(row) >= 3:
-                            code = row[2].strip().replace(" ", "").lower()
-                            if code:
-                                self.hex_codes_for_parsing.append(code)
-                self.hex_codes_for_parsing.sort(key=len, reverse=True)
-            except:
-                pass
-
     def load_csv_data(self):
-        cmd_map = {}
-        quick_data = {'labels': [], 'map': {}}
+        try:
+            commands = ebp_core.load_command_table(CSV_FILENAME)
+        except Exception as e:
+            messagebox.showerror("CSV Error", f"Failed to read {CSV_FILENAME}:\n{e}")
+            return ebp_core.CommandTable()
         if os.path.exists(CSV_FILENAME):
-            try:
-                with open(CSV_FILENAME, 'r', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    for row in reader:
-                        if len(row) >= 2:
-                            key = row[0].strip()
-                            val = row[1].strip()
-                            if key:
-                                cmd_map[key] = val
-                        if len(row) >= 4:
-                            code = row[2].strip()
-                            label = row[3].strip()
-                            if label:
-                                quick_data['labels'].append(label)
-                                quick_data['map'][label] = code
-                print(f"Loaded CSV: {len(cmd_map)} cmds, {len(quick_data['labels'])} quick inputs.")
-            except Exception as e:
-                messagebox.showerror("CSV Error", f"Failed to read {CSV_FILENAME}:\n{e}")
-        return cmd_map, quick_data
+            print(f"Loaded CSV: {len(commands.command_map)} cmds, {len(commands.quick_input['labels'])} quick inputs.")
+        return commands
 
     def _setup_top_nav(self):
         nav_frame = tk.Frame(self.main_container, bg="#333", pady=10, padx=10)
@@ -270,9 +233,9 @@ class DataEntryApp:
             row = RowWidget(
                 self.editor_frame,
                 i,
-                self.recalculate_cumulative,
+                self.on_row_change,
                 self.move_focus,
-                self.command_map,
+                self.command_matcher,
                 self.quick_input_data
             )
             self.rows.append(row)
@@ -359,6 +322,9 @@ class DataEntryApp:
                         bg="#444", fg="white", font=("Arial", 10, "bold"), relief="flat", padx=20, pady=12)
         btn.pack(side="left")
 
+        tk.Button(bottom_row_frame, text="Add Profiles to EBP", command=self.add_profiles_data,
+                  bg="#666", fg="white", font=("Arial", 9, "bold"), width=20).pack(side="left", padx=(10, 0))
+
     def select_master_file(self):
         filename = filedialog.askopenfilename(
             title="Select Target Master File",
@@ -392,14 +358,8 @@ class DataEntryApp:
         filename = filedialog.askopenfilename(initialdir=WORKER_DIR, title="Load Worker Profile", filetypes=(("JSON Files", "*.json"), ("All Files", "*.*")))
         if filename:
             try:
-                with open(filename, 'r') as f:
-                    loaded_data = json.load(f)
-                if not isinstance(loaded_data, dict):
-                    raise ValueError("Invalid file format")
-                self.data_store = loaded_data
-                for field in self.fields:
-                    if field not in self.data_store:
-                        self.data_store[field] = [{"c1": "", "text": ""} for _ in range(NUM_ROWS)]
+                self.data_store = ebp_core.load_worker_profile(filename, self.fields)
+                self.offsets.load_store(self.data_store)
                 self.load_current_field_data()
                 messagebox.showinfo("Success", "Worker Profile Loaded.")
             except Exception as e:
@@ -433,28 +393,8 @@ class DataEntryApp:
 
     # --- CORE LOGIC ---
     def update_footer_tables(self):
-        temp_store = self.data_store.copy()
-        current_rows_data = []
-        for row in self.rows:
-            current_rows_data.append(row.get_data())
-        temp_store[self.current_field] = current_rows_data
-
-        entry_offsets = []
-        jump_offsets = {f"j{i:02X}": None for i in range(12)}
-        global_offset = 0
-        
-        for field in self.fields:
-            entry_offsets.append(global_offset)
-            rows = temp_store[field]
-            for r in rows:
-                tag = r['c1']
-                if tag in jump_offsets and jump_offsets[tag] is None:
-                    jump_offsets[tag] = global_offset
-                txt = r['text'].replace(" ", "")
-                length = 0
-                if txt:
-                    length = (len(txt) + 1) // 2
-                global_offset += length
+        entry_offsets = self.offsets.entry_offsets()
+        jump_offsets = self.offsets.jump_offsets()
 
         entry_str_parts = []
         for off in entry_offsets:
@@ -480,6 +420,7 @@ class DataEntryApp:
     def switch_context(self, new_field):
         if self.current_field == new_field:
             return
+        self._flush_pending_refresh()
         self.save_current_field_data()
         self.current_field = new_field
         self._highlight_active_button()
@@ -498,63 +439,79 @@ class DataEntryApp:
             data_list.append(row.get_data())
         self.data_store[self.current_field] = data_list
 
-    def get_previous_pages_total(self):
-        total = 0
-        current_idx = self.fields.index(self.current_field)
-        for i in range(current_idx):
-            field_name = self.fields[i]
-            rows = self.data_store[field_name]
-            for r in rows:
-                txt = r['text'].replace(" ", "")
-                if txt:
-                    total += (len(txt) + 1) // 2
-        return total
-
     def load_current_field_data(self):
         data_list = self.data_store[self.current_field]
-        for i, row in enumerate(self.rows):
+        page_rows = []
+        for i in range(len(self.rows)):
             if i < len(data_list):
-                row.set_data(data_list[i])
+                page_rows.append(data_list[i])
             else:
-                row.set_data({"c1": "", "text": ""})
+                page_rows.append({"c1": "", "text": ""})
+        # The page shows exactly len(self.rows) rows, index those
+        self.offsets.load_field(self.current_field, page_rows)
+        for row, data in zip(self.rows, page_rows):
+            row.set_data(data)
         self.recalculate_cumulative()
 
+    def on_row_change(self, row_index):
+        self._schedule_refresh(row_index=row_index)
+
+    def _refresh_row_offsets(self, start_index):
+        for i in range(start_index, len(self.rows)):
+            self.rows[i].set_display_count(self.offsets.row_offset(self.current_field, i))
+
     def recalculate_cumulative(self):
-        running_total = self.get_previous_pages_total()
-        for row in self.rows:
-            row.set_display_count(running_total)
-            running_total += row.get_text_length()
+        self._schedule_refresh(full=True)
+
+    # --- REFRESH SCHEDULER ---
+    def _schedule_refresh(self, row_index=None, full=False):
+        """
+        Marks rows (or the whole page) dirty. Any burst of changes made before
+        Tk goes idle (page switch, profile load, typing) is flushed by a
+        single recompute and repaint.
+        """
+        if full:
+            self._dirty_full = True
+        if row_index is not None:
+            self._dirty_rows.add(row_index)
+        if self._refresh_job is None:
+            self._refresh_job = self.root.after_idle(self._flush_refresh)
+
+    def _flush_refresh(self):
+        self._refresh_job = None
+        dirty_rows, self._dirty_rows = self._dirty_rows, set()
+        full, self._dirty_full = self._dirty_full, False
+
+        first_moved = 0 if full else None
+        for i in sorted(dirty_rows):
+            row = self.rows[i]
+            row.update_annotation()
+            data = row.get_data()
+            if self.offsets.set_row(self.current_field, i, data['c1'], data['text']):
+                if first_moved is None:
+                    first_moved = i + 1
+
+        if first_moved is not None:
+            self._refresh_row_offsets(first_moved)
         self.update_footer_tables()
 
+    def _flush_pending_refresh(self):
+        """Runs a scheduled refresh now (e.g. before the rows switch to another page)."""
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+            self._flush_refresh()
+
     # --- SCANNING LOGIC (Reusable) ---
 
-    def _scan_file_logic(self, filename):
-        """Shared scanning logic for both Load and Update functions."""
-        SIGNATURE = bytes.fromhex("81 82 83 80 71 72 73 70 61 62 63 60")
-        SIG_OFFSET_FROM_START = OBJECT_TOTAL_SIZE - 12
-        found_objects = []
-        
+    def _scan_file_logic(self, filename, parse=False):
+        """
+        Shared scanning logic for both Load and Update functions. Returns an open ScanResult.
+        With parse=True the file is parsed once into result.ebp, which the update then edits.
+        """
         try:
-            with open(filename, "rb") as f:
-                file_data = f.read()
-            
-            search_index = 0
-            while True:
-                sig_index = file_data.find(SIGNATURE, search_index)
-                if sig_index == -1:
-                    break 
-                
-                obj_start_index = sig_index - SIG_OFFSET_FROM_START
-                if obj_start_index < 0:
-                    search_index = sig_index + 1
-                    continue
-
-                obj_end_index = obj_start_index + OBJECT_TOTAL_SIZE
-                found_object = file_data[obj_start_index : obj_end_index]
-                found_objects.append((found_object, obj_start_index))
-                search_index = sig_index + 1
-                
-            return found_objects
+            if parse:
+                return ebp_core.ScanResult.from_ebp(ebp_core.EbpFile.from_file(filename))
+            return ebp_core.ScanResult(filename)
         except Exception as e:
             messagebox.showerror("Scan Error", f"An error occurred:\n{e}")
             return None
@@ -577,17 +534,21 @@ class DataEntryApp:
             return
 
         found_objects = self._scan_file_logic(filename)
+        if found_objects is None:
+            return
         
         if not found_objects:
+            found_objects.close()
             messagebox.showinfo("Scan Result", "No Custom Workers found.")
             return
 
         print(f"\nScan Complete. Found {len(found_objects)} worker(s).")
         
         if len(found_objects) == 1:
-            ans = messagebox.askyesno("Load Data", f"Found 1 object at 0x{found_objects[0][1]:X}.\nLoad into UI?")
+            ans = messagebox.askyesno("Load Data", f"Found 1 object at 0x{found_objects.offsets[0]:X}.\nLoad into UI?")
             if ans:
-                self.load_from_object(found_objects[0][0])
+                self.load_from_object(found_objects[0])
+            found_objects.close()
         else:
             self._show_worker_selection_dialog(found_objects, mode="load")
 
@@ -609,27 +570,34 @@ class DataEntryApp:
             lb.pack(side="left", fill="both", expand=True)
             scrollbar.config(command=lb.yview)
             
-            for i, (data, offset) in enumerate(found_objects):
+            for i, offset in enumerate(found_objects.offsets):
                 lb.insert(tk.END, f"Worker #{i+1} - Offset: 0x{offset:08X}")
+
+            def on_close():
+                found_objects.close()
+                selection_win.destroy()
                 
             def on_confirm():
                 selection = lb.curselection()
                 if selection:
                     index = selection[0]
-                    data_bytes, offset = found_objects[index]
+                    offset = found_objects.offsets[index]
                     
                     if mode == "load":
-                        self.load_from_object(data_bytes)
+                        self.load_from_object(found_objects[index])
+                        on_close()
                     elif mode == "update":
+                        # Release the views before editing the parsed file
+                        ebp = found_objects.ebp
+                        on_close()
                         if self.target_file_path and os.path.exists(self.target_file_path):
-                            self._perform_update_write(self.target_file_path, offset)
+                            self._perform_update_write(self.target_file_path, offset, ebp)
                         else:
                             messagebox.showerror("Error", "Target file path was lost. Please try again.")
-                    
-                    selection_win.destroy()
                 else:
                     messagebox.showwarning("Selection", "Please select a worker first.")
 
+            selection_win.protocol("WM_DELETE_WINDOW", on_close)
             tk.Button(selection_win, text=f"{mode.title()} Selected", command=on_confirm, bg="#007acc", fg="white").pack(pady=10)
             # --- NEW UPDATE LOGIC ---
 
@@ -645,36 +613,41 @@ class DataEntryApp:
         if not filename:
             return
 
-        # Scan internally
-        found_objects = self._scan_file_logic(filename)
+        # Scan internally, keeping the parsed file for the write
+        found_objects = self._scan_file_logic(filename, parse=True)
+        if found_objects is None:
+            return
         
         if not found_objects:
+            found_objects.close()
             messagebox.showerror("Error", "No custom workers found in this file to update.")
             return
 
         self.target_file_path = filename # Store for the dialog callback
 
         if len(found_objects) == 1:
-            ans = messagebox.askyesno("Update Worker", f"Found 1 worker at 0x{found_objects[0][1]:X}.\nOverwrite this worker with current UI data?")
+            offset, ebp = found_objects.offsets[0], found_objects.ebp
+            found_objects.close()
+            ans = messagebox.askyesno("Update Worker", f"Found 1 worker at 0x{offset:X}.\nOverwrite this worker with current UI data?")
             if ans:
-                self._perform_update_write(filename, found_objects[0][1])
+                self._perform_update_write(filename, offset, ebp)
         else:
             self._show_worker_selection_dialog(found_objects, mode="update")
 
-    def _perform_update_write(self, filename, offset):
+    def _perform_update_write(self, filename, offset, ebp):
         """
-        Reads 'X' (first 4 bytes) from the file at 'offset'.
-        Generates new object where pointers = X + RelativePos.
-        Writes result back to file.
+        Reads 'X' (first 4 bytes) at 'offset' of 'ebp', the file as the scan
+        parsed it. Generates new object where pointers = X + RelativePos.
+        Writes result back to file (atomically). An object that outgrew its
+        place is moved, see ebp_core.replace_object.
         """
         try:
             # 1. Read 'X' (The Anchor)
-            with open(filename, "rb") as f:
-                f.seek(offset)
-                x_bytes = f.read(4)
-                if len(x_bytes) < 4:
-                    raise ValueError("Unexpected EOF reading anchor X.")
-                x_val = struct.unpack('<I', x_bytes)[0]
+            original = bytes(ebp.data)
+            x_bytes = ebp.data[offset : offset + 4]
+            if len(x_bytes) < 4:
+                raise ValueError("Unexpected EOF reading anchor X.")
+            x_val = struct.unpack('<I', x_bytes)[0]
             
             print(f"Updating Worker at 0x{offset:08X}")
             print(f"Captured Anchor X: 0x{x_val:08X}")
@@ -686,9 +659,11 @@ class DataEntryApp:
                 return # Error during generation
 
             # 3. Write it back
-            with open(filename, "r+b") as f:
-                f.seek(offset)
-                f.write(new_object)
+            new_loc = ebp_core.replace_object(ebp, offset, new_object)
+            if new_loc != offset:
+                print(f"Object outgrew its place, moved to 0x{new_loc:08X}")
+            ebp_core.write_journaled(filename, original, ebp.data, f"update object at 0x{offset:X}",
+                                     ranges=ebp.written_ranges())
             
             messagebox.showinfo("Success", "Worker updated successfully.")
             print("Worker update complete.")
@@ -698,143 +673,24 @@ class DataEntryApp:
 
     def _generate_relative_update_object(self, anchor_x):
         """
-        Generates the 500-byte object where every pointer is (Anchor_X + Relative_Offset).
+        Generates the object where every pointer is (Anchor_X + Relative_Offset).
         """
         self.save_current_field_data()
-        temp_store = self.data_store
-        
-        entry_final_values = []
-        jump_final_values = {f"j{i:02X}": None for i in range(12)}
-        all_code_bytes = bytearray()
-        
-        current_relative_ptr = 0
-
-        # Calculate Relative Offsets for Code
-        for field in self.fields:
-            # The pointer value is simply Anchor_X + Current_Relative_Distance
-            val = anchor_x + current_relative_ptr
-            
-            # Ensure 32-bit wrap
-            val = val & 0xFFFFFFFF
-            entry_final_values.append(val)
-            
-            rows = temp_store[field]
-            for row in rows:
-                tag = row['c1']
-                if tag in jump_final_values and jump_final_values[tag] is None:
-                    val = anchor_x + current_relative_ptr
-                    val = val & 0xFFFFFFFF
-                    jump_final_values[tag] = val
-
-                txt = row['text'].replace(" ", "").strip()
-                if txt:
-                    try:
-                        b_data = bytes.fromhex(txt)
-                        all_code_bytes.extend(b_data)
-                        current_relative_ptr += len(b_data)
-                    except ValueError:
-                        messagebox.showerror("Hex Error", f"Invalid Hex in {field}: {txt}")
-                        return None
-
-        # Fill missing jumps with 0
-        for k, v in jump_final_values.items():
-            if v is None:
-                jump_final_values[k] = 0
-
-        # Build Buffer
-        buffer = bytearray(b'\x3C' * OBJECT_TOTAL_SIZE)
-        
-        ENTRIES_START = 0
-        JUMPS_START = 32
-        CODE_START = 80
-        FOOTER_START = OBJECT_TOTAL_SIZE - 16
-
-        # Write Entries
-        for i, val in enumerate(entry_final_values):
-            start_idx = ENTRIES_START + (i * 4)
-            buffer[start_idx : start_idx+4] = struct.pack('<I', val)
-
-        # Write Jumps
-        sorted_jumps = [jump_final_values[f"j{i:02X}"] for i in range(12)]
-        for i, val in enumerate(sorted_jumps):
-            start_idx = JUMPS_START + (i * 4)
-            buffer[start_idx : start_idx+4] = struct.pack('<I', val)
-
-        # Write Code
-        code_len = len(all_code_bytes)
-        max_code_space = FOOTER_START - CODE_START 
-        if code_len > max_code_space:
-            messagebox.showerror("Overflow", f"Code is too long! ({code_len} bytes). Max is {max_code_space}.")
-            return None
-        buffer[CODE_START : CODE_START + code_len] = all_code_bytes
-
-        # Footer: Write X (Anchor) into Ref Ptr + Signature
-        buffer[FOOTER_START : FOOTER_START+4] = struct.pack('<I', anchor_x)
-        
-        rest_hex = "81 82 83 80 71 72 73 70 61 62 63 60"
-        rest_bytes = bytes.fromhex(rest_hex)
-        buffer[FOOTER_START+4 : FOOTER_START+16] = rest_bytes
-        
-        return buffer
+        try:
+            return ebp_core.generate_relative_update_object(self.data_store, anchor_x, self.fields)
+        except ebp_core.HexError as e:
+            messagebox.showerror("Hex Error", str(e))
+        except ebp_core.ObjectOverflowError as e:
+            messagebox.showerror("Overflow", str(e))
+        return None
 
     # --- EXISTING PARSING/LOADING/ADDING ---
 
     def load_from_object(self, data_bytes):
         try:
-            FOOTER_START = OBJECT_TOTAL_SIZE - 16
-            footer = data_bytes[FOOTER_START:]
-            ref_ptr = struct.unpack('<I', footer[0:4])[0]
-
-            ENTRIES_START = 0
-            JUMPS_START = 32
-            CODE_START = 80
-            
-            entry_ptrs = []
-            for i in range(8):
-                offset = ENTRIES_START + (i*4)
-                val = struct.unpack('<I', data_bytes[offset:offset+4])[0]
-                entry_ptrs.append(val)
-            
-            jump_ptrs = []
-            for i in range(12):
-                offset = JUMPS_START + (i*4)
-                val = struct.unpack('<I', data_bytes[offset:offset+4])[0]
-                jump_ptrs.append(val)
-
-            rel_entries = []
-            for val in entry_ptrs:
-                rel = val - ref_ptr
-                rel_entries.append(rel)
-            
-            rel_jumps = {}
-            for i, val in enumerate(jump_ptrs):
-                if val != 0:
-                    diff = val - ref_ptr
-                    rel_jumps[diff] = f"j{i:02X}"
-
-            full_code_block = data_bytes[CODE_START : FOOTER_START]
-            new_data_store = {}
-
-            for i, field in enumerate(self.fields):
-                start_offset = rel_entries[i]
-                if i < len(self.fields) - 1:
-                    end_offset = rel_entries[i+1]
-                else:
-                    end_offset = len(full_code_block)
-
-                if start_offset < 0 or start_offset >= len(full_code_block):
-                    chunk = b""
-                else:
-                    if end_offset > len(full_code_block):
-                        end_offset = len(full_code_block)
-                    if end_offset < start_offset:
-                          end_offset = start_offset
-                    chunk = full_code_block[start_offset : end_offset]
-
-                page_rows = self._parse_chunk_to_rows(chunk, start_offset, rel_jumps)
-                new_data_store[field] = page_rows
-
+            new_data_store = self.decode_cache.decode(data_bytes, self.commands, self.fields)
             self.data_store = new_data_store
+            self.offsets.load_store(self.data_store)
             self.load_current_field_data()
             messagebox.showinfo("Success", "Data loaded into UI from Object.")
 
@@ -842,92 +698,8 @@ class DataEntryApp:
             print(f"Parsing Error: {e}")
             messagebox.showerror("Parsing Error", f"Failed to parse object:\n{e}")
 
-    def _parse_chunk_to_rows(self, chunk, chunk_start_rel_offset, jump_map):
-            rows = []
-            cursor = 0
-            length = len(chunk)
-            current_row_bytes = bytearray()
-            current_row_tag = ""
-            
-            def flush_row():
-                nonlocal current_row_bytes, current_row_tag
-                # Only flush if we have content or a tag
-                if len(current_row_bytes) > 0 or current_row_tag:
-                    
-                    # 1. Get Raw Hex
-                    hex_raw = current_row_bytes.hex().upper()
-
-                    # --- NEW LOGIC: COMPRESS PADDING ---
-                    # Find sequences of "3C" repeated 11 or more times (>10)
-                    # and replace them with a single "3C"
-                    hex_raw = re.sub(r'(3C){11,}', '3C', hex_raw)
-                    # -----------------------------------
-                    
-                    # 2. Apply Cosmetic Tweak (Right-aligned 3-byte grouping)
-                    rev_hex = hex_raw[::-1]
-                    chunks = [rev_hex[i:i+6] for i in range(0, len(rev_hex), 6)]
-                    hex_txt = " ".join(chunks)[::-1]
-                    
-                    rows.append({"c1": current_row_tag, "text": hex_txt})
-                
-                current_row_bytes = bytearray()
-                current_row_tag = ""
-
-            while cursor < length:
-                # Absolute offset relative to code block start (80)
-                abs_offset_in_code = chunk_start_rel_offset + cursor
-                
-                # 1. Check if this is a Jump Target
-                if abs_offset_in_code in jump_map:
-                    flush_row()
-                    current_row_tag = jump_map[abs_offset_in_code]
-
-                # 2. Check for CSV Search Terms
-                match_found = False
-                remaining_bytes = chunk[cursor:]
-                remaining_hex = remaining_bytes.hex().lower()
-                
-                for code in self.hex_codes_for_parsing:
-                    if remaining_hex.startswith(code):
-                        # Match!
-                        match_len_bytes = len(code) // 2
-                        
-                        if len(current_row_bytes) > 0:
-                            flush_row()
-                        
-                        # Process the command bytes
-                        cmd_bytes = remaining_bytes[:match_len_bytes]
-                        hex_raw_cmd = cmd_bytes.hex().upper()
-                        
-                        # Apply cosmetic spacing to command too
-                        rev_hex_cmd = hex_raw_cmd[::-1]
-                        chunks_cmd = [rev_hex_cmd[i:i+6] for i in range(0, len(rev_hex_cmd), 6)]
-                        hex_display = " ".join(chunks_cmd)[::-1]
-                        
-                        rows.append({"c1": current_row_tag, "text": hex_display})
-                        current_row_tag = "" # Consumed
-                        
-                        cursor += match_len_bytes
-                        match_found = True
-                        break
-                
-                if match_found:
-                    continue
-
-                # 3. Just a normal byte
-                current_row_bytes.append(chunk[cursor])
-                cursor += 1
-            
-            # Flush leftovers
-            flush_row()
-            
-            # Pad with empty rows if needed
-            while len(rows) < NUM_ROWS:
-                rows.append({"c1": "", "text": ""})
-                
-            return rows[:NUM_ROWS]
     def print_data(self):
-        """Standard 'Add New' Logic (Appends to end)"""
+        """Standard 'Add New' Logic: one read of the file, one write (reuses a hole or appends)"""
         self.save_current_field_data()
         
         # Check if master file is selected
@@ -941,115 +713,43 @@ class DataEntryApp:
         global k
         k = filename
         print(f"Filepath selected: {k}")
-        ebp_patcher.patch_ebp(k, n_clones=1, q_source_id=1)
-        self.root.clipboard_clear()
-        self.root.clipboard_append(k)
-        self.root.update()
 
         print(" EBP WORKER ANALYSIS")
         print(f"File: {os.path.basename(filename)}")
 
+        # One read of the file, then pointer patch, entry / jump pointers,
+        # footer and object all land in the image and in one atomic write
+        metrics = ebp_core.Metrics("add custom worker", file=filename)
         try:
-            file_size = os.path.getsize(filename)
-            entry_val = file_size - 64
-            jump_val = entry_val + 0x20
-            
-            code_start_val = 0
-            with open(filename, "rb") as f:
-                f.seek(0x70)
-                data = f.read(4)
-                if len(data) < 4: return 
-                else:
-                    val_at_70 = int.from_bytes(data, 'little')
-                    code_start_val = val_at_70 + 0x40
-
-            print(f" GENERATING {OBJECT_TOTAL_SIZE}-BYTE OBJECT")
-            print("\n[Updating File Footer Pointers...]")
-            try:
-                with open(filename, "r+b") as f:
-                    f.seek(-20, 2) 
-                    f.write(entry_val.to_bytes(4, 'little'))
-                    f.write(jump_val.to_bytes(4, 'little'))
-            except Exception as e:
-                messagebox.showerror("File Error", f"Could not update file pointers:\n{e}")
-                return 
-
-            final_object = self._generate_byte_object(code_start_val, entry_val)
-
-            if final_object:
-                print("\n[Appending Block to File...]")
-                try:
-                    with open(filename, "ab") as f:
-                        f.write(final_object)
-                    messagebox.showinfo("Success", f"File Pointers updated and new Worker Object appended.")
-                except Exception as e:
-                    messagebox.showerror("File Error", f"Could not append to file:\n{e}")
+            with ebp_core.EbpTransaction(filename, label="add custom worker", metrics=metrics) as txn:
+                [(clone_loc, object_loc)] = ebp_patcher.add_custom_workers(txn.ebp, [self.data_store], 1, self.fields, metrics)
+                print(f"\n[Footer Pointers at 0x{clone_loc:X}, Object at 0x{object_loc:X}]")
+            metrics.finish(ok=True)
+            if PRINT_METRICS:
+                print(f" Metrics: {metrics.to_json()}")
+            messagebox.showinfo("Success", f"File Pointers updated and new Worker Object appended.")
+        except ebp_core.HexError as e:
+            metrics.finish(ok=False)
+            messagebox.showerror("Hex Error", str(e))
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to analyze EBP file:\n{e}")
+            metrics.finish(ok=False)
+            messagebox.showerror("Error", f"Failed to add worker to EBP file:\n{e}")
 
-    def _generate_byte_object(self, base_offset, custom_entry_ptr):
-        """Standard generator for NEW objects (uses full formula)"""
-        def calculate_complex_pointer(relative_pos):
-            pos_in_obj = relative_pos + 0x50
-            step_2 = pos_in_obj + custom_entry_ptr
-            step_3 = step_2 + 0x40
-            final_val = step_3 - base_offset
-            return final_val & 0xFFFFFFFF
+    def add_profiles_data(self):
+        """Bulk 'Add New': one custom worker per selected profile, in one patch and one write."""
+        if self.master_file_path and os.path.exists(self.master_file_path):
+            filename = self.master_file_path
+        else:
+            filename = filedialog.askopenfilename(title="Select EBP File", filetypes=(("EBP Files", "*.ebp"), ("All Files", "*.*")))
+        if not filename: return
 
-        self.save_current_field_data()
-        temp_store = self.data_store
-        entry_final_values = [] 
-        jump_final_values = {f"j{i:02X}": None for i in range(12)}
-        all_code_bytes = bytearray()
-        current_relative_ptr = 0
+        profiles = filedialog.askopenfilenames(initialdir=WORKER_DIR, title="Select Worker Profiles", filetypes=(("JSON Files", "*.json"), ("All Files", "*.*")))
+        if not profiles: return
 
-        for field in self.fields:
-            val = calculate_complex_pointer(current_relative_ptr)
-            entry_final_values.append(val)
-            rows = temp_store[field]
-            for row in rows:
-                tag = row['c1']
-                if tag in jump_final_values and jump_final_values[tag] is None:
-                    val = calculate_complex_pointer(current_relative_ptr)
-                    jump_final_values[tag] = val
-                txt = row['text'].replace(" ", "").strip()
-                if txt:
-                    try:
-                        b_data = bytes.fromhex(txt)
-                        all_code_bytes.extend(b_data)
-                        current_relative_ptr += len(b_data)
-                    except ValueError:
-                        return None
-
-        for k, v in jump_final_values.items():
-            if v is None: jump_final_values[k] = 0 
-
-        buffer = bytearray(b'\x3C' * OBJECT_TOTAL_SIZE)
-        ENTRIES_START = 0
-        JUMPS_START = 32
-        CODE_START  = 80
-        FOOTER_START = OBJECT_TOTAL_SIZE - 16
-
-        for i, val in enumerate(entry_final_values):
-            start_idx = ENTRIES_START + (i * 4)
-            buffer[start_idx : start_idx+4] = struct.pack('<I', val)
-
-        sorted_jumps = [jump_final_values[f"j{i:02X}"] for i in range(12)]
-        for i, val in enumerate(sorted_jumps):
-            start_idx = JUMPS_START + (i * 4)
-            buffer[start_idx : start_idx+4] = struct.pack('<I', val)
-
-        code_len = len(all_code_bytes)
-        max_code_space = FOOTER_START - CODE_START 
-        if code_len > max_code_space: return None
-        buffer[CODE_START : CODE_START + code_len] = all_code_bytes
-
-        init_ptr_bytes = buffer[0:4]
-        buffer[FOOTER_START : FOOTER_START+4] = init_ptr_bytes
-        rest_hex = "81 82 83 80 71 72 73 70 61 62 63 60"
-        rest_bytes = bytes.fromhex(rest_hex)
-        buffer[FOOTER_START+4 : FOOTER_START+16] = rest_bytes
-        return buffer
+        if ebp_patcher.add_workers_from_profiles(filename, list(profiles)):
+            messagebox.showinfo("Success", f"{len(profiles)} custom worker(s) added.")
+        else:
+            messagebox.showerror("Error", "Failed to add the workers, see the console for details.")
 
 def create_dummy_csv():
     if not os.path.exists(CSV_FILENAME):
@@ -0,0 +1,251 @@
+"""
+Benchmark suite for the EBP tools, on synthetic maps (no game data needed).
+
+Builds a .ebp from scratch with the requested worker / sub-routine counts,
+script size and number of custom worker objects, then times every stage
+the editor and the patcher go through and reports MB/s and workers/s.
+
+    python ebp_bench.py
+    python ebp_bench.py --workers 120 --subs 40 --code-mb 4 --objects 200 --json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+try:
+    from Worker_Data import ebp_core, ebp_patcher # Next to FFX_Worker_mod.py
+except ImportError:
+    import ebp_core                               # Run from the Worker_Data folder
+    import ebp_patcher
+
+CSV_CANDIDATES = ("ebpcommands.csv", os.path.join("Worker_Data", "ebpcommands.csv"))
+FALLBACK_COMMANDS = ("AE0100 D80100", "AEFFFF B53300 D87700", "D81A00", "AE0500 D80000", "B00100")
+MIN_SCRIPT_SIZE = 0x40 # Room for one entry table (0x20 bytes) and its jump table (0x20 bytes)
+
+# ==================================================
+# SYNTHETIC DATA
+# ==================================================
+def load_bench_commands():
+    """The command table next to this script, or an empty one."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for candidate in CSV_CANDIDATES:
+        path = os.path.join(here, candidate)
+        if os.path.exists(path):
+            return ebp_core.load_command_table(path)
+    return ebp_core.CommandTable([])
+
+def random_script(rng, size, total_workers):
+    """'size' bytes of 1- and 3-byte instructions, with B3 worker references."""
+    code = bytearray()
+    while len(code) < size:
+        roll = rng.random()
+        if roll < 0.15:
+            code += bytes([ebp_core.OPCODE_WORKER_ID]) + struct.pack('<H', rng.randrange(total_workers + 1))
+        elif roll < 0.6:
+            code += bytes([rng.choice((0xAE, 0xAF, 0xB5, 0xD8, 0xB0))]) + struct.pack('<H', rng.randrange(0x100))
+        else:
+            code.append(rng.randrange(0x80))
+    del code[size:]
+    return code
+
+def random_data_store(rng, commands, fields=ebp_core.FIELDS, total_workers=0):
+    """A worker profile whose code fits in one custom object (with B3 calls if total_workers)."""
+    choices = list(commands.quick_input['map'].values()) or list(FALLBACK_COMMANDS)
+    budget = (ebp_core.OBJECT_FOOTER_START - ebp_core.OBJECT_CODE_START) // len(fields)
+    store = ebp_core.empty_data_store(fields)
+    for field in fields:
+        used = 0
+        for row in store[field]:
+            if total_workers and rng.random() < 0.2:
+                text = "B3" + struct.pack('<H', rng.randrange(total_workers)).hex().upper()
+            else:
+                text = rng.choice(choices)
+            length = ebp_core.row_byte_length(text)
+            if used + length > budget:
+                break
+            used += length
+            row['text'] = text
+            if rng.random() < 0.1:
+                row['c1'] = rng.choice(ebp_core.JUMP_TAGS)
+    return store
+
+def make_synthetic_ebp(workers=60, subs=20, code_size=1 << 20, objects=0, seed=0, commands=None,
+                       gap=0, shuffle=False, tail=0, orphans=0):
+    """
+    Builds a valid .ebp image:
+    - header with the script header at 0x70 and the pointer table at 0x78
+    - 'gap' free bytes, then one 52-byte data block per worker (in ID order,
+      or shuffled), each pointing into the script
+    - 'code_size' bytes of script (at least MIN_SCRIPT_SIZE, so every
+      worker's entry and jump tables lie inside it), then 'tail' bytes of
+      other data
+    - 'objects' custom workers added the way the editor does it (a clone
+      of worker 1 plus a generated object appended at EOF); the first
+      'orphans' of them keep the script tables of worker 1, so their
+      objects are dead holes
+
+    :return: bytearray
+    """
+    rng = random.Random(seed)
+    code_size = max(code_size, MIN_SCRIPT_SIZE)
+    total = workers + subs
+    table_end = ebp_core.POINTER_TABLE_START + total * 4
+    code_start = table_end + gap + total * ebp_core.WORKER_DATA_SIZE
+    order = list(range(total))
+    if shuffle:
+        rng.shuffle(order)
+
+    image = bytearray(code_start)
+    image[0:4] = b"EBP\x00"
+    struct.pack_into('<IHH', image, ebp_core.SCRIPT_HEADER_OFFSET, code_start - ebp_core.DATA_BASE, total, workers)
+    for slot, worker_id in enumerate(order):
+        loc = table_end + gap + slot * ebp_core.WORKER_DATA_SIZE
+        struct.pack_into('<I', image, ebp_core.POINTER_TABLE_START + worker_id * 4, loc - ebp_core.DATA_BASE)
+        block = bytearray(rng.randrange(0x80) for _ in range(ebp_core.WORKER_DATA_SIZE))
+        entry_ptr = code_start - ebp_core.DATA_BASE + rng.randrange(code_size - MIN_SCRIPT_SIZE + 1)
+        struct.pack_into('<II', block, ebp_core.WORKER_TABLES_OFFSET, entry_ptr, entry_ptr + 0x20)
+        image[loc : loc + ebp_core.WORKER_DATA_SIZE] = block
+    image += random_script(rng, code_size, total)
+    image += bytes(rng.randrange(0x80) for _ in range(tail))
+
+    if objects:
+        commands = commands or load_bench_commands()
+        ebp = ebp_core.EbpFile(image)
+        for index in range(objects):
+            clone_loc = ebp_patcher.apply_clone_specs(ebp, [(min(1, workers - 1), 1)], fit=None)[0]
+            entry_val = len(ebp.data) - ebp_core.DATA_BASE
+            obj = ebp_core.generate_byte_object(random_data_store(rng, commands, total_workers=total), ebp.code_start, entry_val)
+            if index >= orphans:
+                ebp.set_worker_tables(clone_loc, entry_val, entry_val + 0x20)
+            ebp.append(obj)
+        image = ebp.data
+    return image
+
+# ==================================================
+# TIMING
+# ==================================================
+def best_time(func, repeat, setup=None):
+    """Best wall time of 'repeat' runs of func(setup()) (setup is not timed)."""
+    best = None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmarks(workers=60, subs=20, code_size=1 << 20, objects=50, clones=10, repeat=5, seed=0):
+    """
+    Times every stage on one synthetic map.
+
+    :return: list of {'stage', 'seconds', 'bytes', 'workers', 'mb_per_s', 'workers_per_s'}
+    """
+    commands = load_bench_commands()
+    image = bytes(make_synthetic_ebp(workers, subs, code_size, objects, seed, commands))
+    rng = random.Random(seed)
+    stores = [random_data_store(rng, commands) for _ in range(max(1, objects))]
+    ebp = ebp_core.EbpFile(image)
+    objects = ebp.objects()
+    object_bytes = [image[off : off + size] for off, size in objects]
+    code_chunks = [obj[ebp_core.OBJECT_CODE_START : ebp_core.object_footer(obj, 0, len(obj))[0]] for obj in object_bytes]
+
+    results = []
+    def record(stage, seconds, n_bytes, n_workers):
+        results.append({
+            'stage': stage,
+            'seconds': seconds,
+            'bytes': n_bytes,
+            'workers': n_workers,
+            'mb_per_s': n_bytes / seconds / 1e6 if seconds else float('inf'),
+            'workers_per_s': n_workers / seconds if seconds else float('inf'),
+        })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.ebp")
+        with open(path, 'wb') as f:
+            f.write(image)
+
+        def fresh_copy():
+            with open(path, 'wb') as f:
+                f.write(image)
+            return path
+
+        def quiet(func):
+            def run(arg):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return func(arg)
+            return run
+
+        record("patch_ebp (memory)",
+               best_time(lambda _: ebp_patcher.patch_buffer_batch(image, [(1, clones)]), repeat),
+               len(image), clones)
+        record("patch_ebp (file)",
+               best_time(quiet(lambda p: ebp_patcher._patch_ebp_file(p, clones, 1)), repeat, fresh_copy),
+               len(image), clones)
+        record("patch_ebp (write)",
+               best_time(quiet(lambda p: ebp_patcher._patch_ebp_memory(p, [(1, clones)])), repeat, fresh_copy),
+               len(image), clones)
+
+        def scan(_):
+            with ebp_core.ScanResult(path) as result:
+                return len(result)
+        fresh_copy()
+        record("_scan_file_logic", best_time(scan, repeat), len(image), len(objects))
+
+    trie = commands.opcode_trie
+    record("_parse_chunk_to_rows",
+           best_time(lambda _: [ebp_core.parse_chunk_to_rows(chunk, 0, {}, trie) for chunk in code_chunks], repeat),
+           sum(len(chunk) for chunk in code_chunks), len(code_chunks))
+    generated = [ebp_core.generate_byte_object(store, ebp.code_start, len(image)) for store in stores]
+    record("_generate_byte_object",
+           best_time(lambda _: [ebp_core.generate_byte_object(store, ebp.code_start, len(image)) for store in stores], repeat),
+           sum(len(obj) for obj in generated), len(stores))
+    record("load_from_object",
+           best_time(lambda _: [ebp_core.decode_object(obj, trie) for obj in object_bytes], repeat),
+           sum(len(obj) for obj in object_bytes), len(object_bytes))
+    cache = ebp_core.DecodeCache(maxsize=max(1, len(object_bytes)))
+    for obj in object_bytes:
+        cache.decode(obj, commands)
+    record("load_from_object (cached)",
+           best_time(lambda _: [cache.decode(obj, commands) for obj in object_bytes], repeat),
+           sum(len(obj) for obj in object_bytes), len(object_bytes))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EBP patcher and editor stages on a synthetic map.")
+    parser.add_argument("--workers", type=int, default=60, help="Non-sub workers (default 60)")
+    parser.add_argument("--subs", type=int, default=20, help="Sub-routine workers (default 20)")
+    parser.add_argument("--code-mb", type=float, default=1.0, help="Script size in MB (default 1)")
+    parser.add_argument("--objects", type=int, default=50, help="Custom worker objects in the map (default 50)")
+    parser.add_argument("--clones", type=int, default=10, help="Clones added by the patch stages (default 10)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per stage, the best one counts (default 5)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.workers < 2:
+        parser.error("--workers must be at least 2")
+
+    results = run_benchmarks(args.workers, args.subs, int(args.code_mb * (1 << 20)),
+                             args.objects, args.clones, max(1, args.repeat), args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"Synthetic map: {args.workers} workers, {args.subs} sub-routines, "
+          f"{args.code_mb:g} MB script, {args.objects} objects (best of {args.repeat})")
+    print(f"  {'stage':<28}{'ms':>10}{'MB/s':>12}{'workers/s':>14}")
+    for r in results:
+        print(f"  {r['stage']:<28}{r['seconds'] * 1000:>10.2f}{r['mb_per_s']:>12.1f}{r['workers_per_s']:>14.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
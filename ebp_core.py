@@ -0,0 +1,1681 @@
+"""
+Headless EBP core: command table, custom worker object generation,
+scanning and decoding, and the editor's offset bookkeeping.
+
+No tkinter here. Errors are raised (EbpError and subclasses) instead of
+being shown in dialogs, so this module can be used from the GUI, the batch
+command line, worker processes and scripts alike.
+"""
+import csv
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from array import array
+
+# --- CONSTANTS ---
+WORKER_DATA_SIZE = 52
+WORKER_TABLES_OFFSET = WORKER_DATA_SIZE - 20   # Entry / jump table pointers inside a worker block
+DATA_BASE = 0x40                               # File pointers are relative to this
+SCRIPT_HEADER_OFFSET = 0x70                    # Code start, total workers, non-sub workers
+POINTER_TABLE_START = 0x78
+NUM_ROWS = 24
+FIELDS = ("INIT", "MAIN", "TALK", "SCOUT", "CROSS", "TOUCH", "E06", "E07")
+JUMP_TAGS = tuple(f"j{i:02X}" for i in range(12))
+
+# --- OBJECT LAYOUT ---
+OBJECT_ENTRIES_START = 0
+OBJECT_JUMPS_START = 32
+OBJECT_CODE_START = 80
+OBJECT_PAD_BYTE = 0x3C
+# Legacy objects: always 500 bytes, footer = ref + signature
+OBJECT_TOTAL_SIZE = 500
+OBJECT_FOOTER_START = OBJECT_TOTAL_SIZE - 16
+OBJECT_SIGNATURE = bytes.fromhex("81 82 83 80 71 72 73 70 61 62 63 60")
+# Sized objects: code padded to 4 bytes, footer = ref + code length + signature
+OBJECT_SIZED_FOOTER_SIZE = 20
+OBJECT_SIZED_SIGNATURE = bytes.fromhex("81 82 83 80 71 72 73 70 61 62 63 64")
+
+# --- SCRIPT ---
+OPCODE_WORKER_ID = 0xB3   # B3 xx xx -> operand is a worker ID
+
+# --- STREAMING ---
+STREAM_CHUNK_SIZE = 1 << 20           # Bytes read per step by the streaming scanners
+STREAM_SCAN_THRESHOLD = 256 << 20     # ScanResult streams files larger than this
+# -----------------
+
+class EbpError(Exception):
+    """Base error for everything the core refuses to do."""
+
+class HexError(EbpError):
+    """A CODE INPUT row is not valid hex."""
+
+class ProfileError(EbpError, ValueError):
+    """A worker profile JSON is not a data_store."""
+
+class ObjectOverflowError(EbpError):
+    """The code does not fit in a custom worker object."""
+
+# ==================================================
+# INSTRUMENTATION
+# ==================================================
+_METRICS_HOOKS = []
+
+def add_metrics_hook(hook):
+    """hook(metrics) is called with every finished Metrics (patches, worker adds...)."""
+    _METRICS_HOOKS.append(hook)
+
+def remove_metrics_hook(hook):
+    _METRICS_HOOKS.remove(hook)
+
+class Metrics:
+    """
+    Timing spans and counters for one operation on one file.
+    
+        metrics = Metrics("patch", file=path)
+        metrics.phase("mapping")          # sequential phases: ends the previous one
+        with metrics.span("write"):       # or an explicit span
+            ...
+        metrics.count("bytes_moved", 52)
+        metrics.finish()                  # hands it to the hooks
+    
+    Spans with the same name add up. Counters used across the tools:
+    bytes_moved, bytes_appended, workers_evicted, ids_renumbered and
+    syscalls: file system calls made (open, read, write, seek, close, fsync,
+    stat, chmod, link, unlink, replace), counted once per call where it is
+    made. A library helper such as a file copy counts as one call.
+    """
+    def __init__(self, operation, **info):
+        self.operation = operation
+        self.info = info
+        self.spans = {}
+        self.counters = {}
+        self.seconds = None
+        self._start = time.perf_counter()
+        self._phase = None
+        self._phase_start = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+
+    def phase(self, name=None):
+        """Ends the running phase (if any) and starts 'name' (None: just end it)."""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.spans[self._phase] = self.spans.get(self._phase, 0.0) + now - self._phase_start
+        self._phase, self._phase_start = name, now
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self, **info):
+        """Closes the running phase, stamps the total time and calls the hooks."""
+        self.phase(None)
+        self.info.update(info)
+        self.seconds = time.perf_counter() - self._start
+        for hook in list(_METRICS_HOOKS):
+            hook(self)
+        return self
+
+    def to_dict(self):
+        return {
+            'operation': self.operation,
+            **self.info,
+            'seconds': self.seconds,
+            'spans': dict(self.spans),
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+# ==================================================
+# EBP FILE MODEL
+# ==================================================
+_POINTER_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+class EbpFile:
+    """
+    One parsed .ebp image, shared by every tool that reads or edits it.
+    
+    - data: the whole file as a bytearray (edited in place)
+    - code_start_rel / total_workers / nonsub_workers: the script header at 0x70
+    - pointers: the worker pointer table as an array of 32-bit values
+    - written: (start, end) of the writes since parsing, for the journal
+    
+    Every mutation goes through the methods below so the parsed fields and
+    the bytes never disagree.
+    """
+    HEADER = struct.Struct('<IHH')
+
+    def __init__(self, data):
+        self.data = data if isinstance(data, bytearray) else bytearray(data)
+        if len(self.data) < POINTER_TABLE_START:
+            raise EbpError(f"File is too short for an .ebp header ({len(self.data)} bytes).")
+        self.code_start_rel, self.total_workers, self.nonsub_workers = self.HEADER.unpack_from(self.data, SCRIPT_HEADER_OFFSET)
+        table_end = POINTER_TABLE_START + self.total_workers * 4
+        if table_end > len(self.data):
+            raise EbpError(f"Pointer table ({self.total_workers} workers) runs past the end of the file.")
+        self.pointers = array(_POINTER_TYPECODE)
+        self.pointers.frombytes(self.data[POINTER_TABLE_START:table_end])
+        if sys.byteorder == 'big':
+            self.pointers.byteswap()
+        self.written = []
+
+    @classmethod
+    def from_file(cls, file_path):
+        with open(file_path, 'rb') as f:
+            return cls(f.read())
+
+    # --- Layout ---
+    @property
+    def code_start(self):
+        return self.code_start_rel + DATA_BASE
+
+    @property
+    def pointer_table_end(self):
+        return POINTER_TABLE_START + self.total_workers * 4
+
+    def data_loc(self, worker_id):
+        return self.pointers[worker_id] + DATA_BASE
+
+    def worker_block(self, worker_id):
+        loc = self.data_loc(worker_id)
+        return bytes(self.data[loc : loc + WORKER_DATA_SIZE])
+
+    def objects(self):
+        return find_objects(self.data)
+
+    def code_regions(self):
+        return find_code_regions(self.data, [p + DATA_BASE for p in self.pointers])
+
+    def written_ranges(self, merge_gap=8):
+        """The writes so far as sorted [(offset, length), ...]; ranges closer than merge_gap are merged."""
+        ranges = []
+        for start, end in sorted(self.written):
+            if ranges and start - (ranges[-1][0] + ranges[-1][1]) <= merge_gap:
+                ranges[-1] = (ranges[-1][0], max(end, ranges[-1][0] + ranges[-1][1]) - ranges[-1][0])
+            else:
+                ranges.append((start, end - start))
+        return ranges
+
+    # --- Mutation ---
+    def write_at(self, pos, chunk):
+        """Same as f.seek(pos); f.write(chunk): grows the image (zero-filled) if needed."""
+        if pos > len(self.data):
+            self.data.extend(bytes(pos - len(self.data)))
+        self.data[pos:pos + len(chunk)] = chunk
+        self.written.append((pos, pos + len(chunk)))
+
+    def append(self, chunk):
+        """Appends at EOF and returns where the chunk starts."""
+        pos = len(self.data)
+        self.data += chunk
+        return pos
+
+    def truncate(self, size):
+        del self.data[size:]
+
+    def _table_bytes(self, start_index, end_index=None):
+        table = self.pointers[start_index:end_index]
+        if sys.byteorder == 'big':
+            table.byteswap()
+        return table.tobytes()
+
+    def set_pointer(self, worker_id, data_loc):
+        self.pointers[worker_id] = data_loc - DATA_BASE
+        struct.pack_into('<I', self.data, POINTER_TABLE_START + worker_id * 4, data_loc - DATA_BASE)
+        self.written.append((POINTER_TABLE_START + worker_id * 4, POINTER_TABLE_START + worker_id * 4 + 4))
+
+    def set_pointers(self, worker_ids, data_locs):
+        """set_pointer for many workers, with one write covering the changed entries."""
+        if not worker_ids:
+            return
+        for worker_id, loc in zip(worker_ids, data_locs):
+            self.pointers[worker_id] = loc - DATA_BASE
+        first, last = min(worker_ids), max(worker_ids) + 1
+        self.write_at(POINTER_TABLE_START + first * 4, self._table_bytes(first, last))
+
+    def insert_pointers(self, index, data_locs):
+        """
+        Inserts table entries at 'index', shifting the rest down in one write.
+        The table grows over whatever follows it: make room first.
+        """
+        self.pointers[index:index] = array(_POINTER_TYPECODE, (loc - DATA_BASE for loc in data_locs))
+        self.write_at(POINTER_TABLE_START + index * 4, self._table_bytes(index))
+
+    def set_worker_counts(self, total_workers, nonsub_workers):
+        self.total_workers = total_workers
+        self.nonsub_workers = nonsub_workers
+        self.HEADER.pack_into(self.data, SCRIPT_HEADER_OFFSET, self.code_start_rel, total_workers, nonsub_workers)
+        self.written.append((SCRIPT_HEADER_OFFSET, SCRIPT_HEADER_OFFSET + self.HEADER.size))
+
+    def set_worker_tables(self, data_loc, entry_ptr, jump_ptr):
+        """Points the worker block at 'data_loc' to its entry and jump tables."""
+        struct.pack_into('<II', self.data, data_loc + WORKER_TABLES_OFFSET, entry_ptr, jump_ptr)
+        self.written.append((data_loc + WORKER_TABLES_OFFSET, data_loc + WORKER_TABLES_OFFSET + 8))
+
+    def remap_worker_ids(self, id_map, start, end):
+        """remap_worker_ids on the image; returns the number of operands rewritten."""
+        hits = []
+        changed = remap_worker_ids(self.data, id_map, start, end, hits)
+        if hits:
+            self.written.append((hits[0], hits[-1] + 2))
+        return changed
+
+def metered_call(metrics, func, *args, **kwargs):
+    """func(*args, **kwargs), counted as one of the 'syscalls' on 'metrics'."""
+    metrics.count("syscalls")
+    return func(*args, **kwargs)
+
+class MeteredFile:
+    """
+    An open binary file whose open/seek/read/write/flush/close calls count
+    as 'syscalls' on 'metrics', so the counts follow the I/O a tool really
+    does. Everything else is passed through.
+    """
+    def __init__(self, f, metrics):
+        self._f = f
+        self._metrics = metrics
+
+    @classmethod
+    def open(cls, file_path, mode, metrics):
+        return cls(metered_call(metrics, open, file_path, mode), metrics)
+
+    def seek(self, *args):
+        return metered_call(self._metrics, self._f.seek, *args)
+
+    def read(self, *args):
+        return metered_call(self._metrics, self._f.read, *args)
+
+    def write(self, data):
+        return metered_call(self._metrics, self._f.write, data)
+
+    def flush(self):
+        return metered_call(self._metrics, self._f.flush)
+
+    def close(self):
+        return metered_call(self._metrics, self._f.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+# ==================================================
+# FILE WRITES (ATOMIC)
+# ==================================================
+def make_backup(file_path, metrics=None):
+    """
+    Keeps the current file as file_path + ".bak".
+    Uses a hard link (no data copied): the next atomic_write replaces the
+    file with a new one, so the link keeps the old contents. Falls back to
+    a full copy where links are not supported.
+    """
+    metrics = metrics if metrics is not None else Metrics("make_backup")
+    backup_path = file_path + ".bak"
+    if metered_call(metrics, os.path.lexists, backup_path):
+        metered_call(metrics, os.remove, backup_path)
+    try:
+        metered_call(metrics, os.link, file_path, backup_path)
+    except (OSError, AttributeError):
+        metered_call(metrics, shutil.copy2, file_path, backup_path)
+    return backup_path
+
+def atomic_write(file_path, data, backup=False, metrics=None):
+    """
+    Replaces file_path with 'data' all-or-nothing: writes a temp file in the
+    same folder, syncs it, then swaps it in with one os.replace. A crash
+    leaves either the old file or the new one, never a mix.
+    """
+    metrics = metrics if metrics is not None else Metrics("atomic_write")
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = metered_call(metrics, tempfile.mkstemp, prefix=os.path.basename(file_path) + ".",
+                                 suffix=".tmp", dir=directory)
+    try:
+        with MeteredFile(os.fdopen(fd, 'wb'), metrics) as f:
+            f.write(data)
+            f.flush()
+            metered_call(metrics, os.fsync, f.fileno())
+        if metered_call(metrics, os.path.exists, file_path):
+            metered_call(metrics, shutil.copymode, file_path, tmp_path)
+            if backup:
+                make_backup(file_path, metrics)
+        else:
+            umask = metered_call(metrics, os.umask, 0)
+            metered_call(metrics, os.umask, umask)
+            metered_call(metrics, os.chmod, tmp_path, 0o666 & ~umask)   # mkstemp creates 0600
+        metered_call(metrics, os.replace, tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def write_journaled(file_path, old_data, new_data, label, backup=False, metrics=None, ranges=None):
+    """
+    atomic_write + one journal entry describing what changed (see EbpJournal).
+    'ranges' are the [(offset, length), ...] that were written, if known
+    (EbpFile.written_ranges), so only the span they cover is compared.
+    
+    The journal is loaded and the entry built before the file is touched,
+    so an unreadable journal (EbpError) leaves the file as it was. Saving
+    the journal comes after the file is replaced and cannot undo that:
+    returns False if it failed (the next edit then starts a new history).
+    """
+    metrics = metrics if metrics is not None else Metrics("write_journaled")
+    with metrics.span("journal"):
+        journal = EbpJournal(file_path, metrics)
+        journal.record(old_data, new_data, label, ranges)
+    with metrics.span("write"):
+        atomic_write(file_path, new_data, backup=backup, metrics=metrics)
+    with metrics.span("journal"):
+        try:
+            journal.save(metrics)
+        except OSError:
+            return False
+    return True
+
+class EbpTransaction:
+    """
+    Groups several edits of one .ebp into a single atomic commit:
+    
+        with EbpTransaction(path, label="add worker") as txn:
+            apply_clone_specs(txn.ebp, ...)
+            txn.ebp.append(...)
+    
+    The file is parsed once into txn.ebp. Nothing touches the disk until the
+    block exits cleanly; an exception or txn.abort() discards every edit.
+    With a label, the commit is also recorded in the file's journal.
+    The read and the commit are timed as "read" / "write" spans on
+    txn.metrics, which the edits inside the block can use too.
+    """
+    def __init__(self, file_path, backup=True, label=None, metrics=None):
+        self.file_path = file_path
+        self.backup = backup
+        self.label = label
+        self.metrics = metrics if metrics is not None else Metrics("transaction", file=file_path)
+        self.ebp = None
+        self._original = None
+        self._aborted = False
+
+    def __enter__(self):
+        with self.metrics.span("read"):
+            with MeteredFile.open(self.file_path, 'rb', self.metrics) as f:
+                self._original = f.read()
+            self.ebp = EbpFile(self._original)
+        return self
+
+    def abort(self):
+        self._aborted = True
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.phase(None)
+        if exc_type is None and not self._aborted:
+            if self.label is None:
+                with self.metrics.span("write"):
+                    atomic_write(self.file_path, self.ebp.data, backup=self.backup, metrics=self.metrics)
+            else:
+                write_journaled(self.file_path, self._original, self.ebp.data, self.label,
+                                backup=self.backup, metrics=self.metrics, ranges=self.ebp.written_ranges())
+        return False
+
+# ==================================================
+# EDIT JOURNAL (UNDO / REDO / REPLAY)
+# ==================================================
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_MAGIC = b"EBPJ"
+JOURNAL_VERSION = 2
+
+def _xor_bytes(a, b):
+    """a XOR b for two equally long byte strings, done on ints rather than per byte."""
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+class JournalEntry:
+    """
+    One committed edit: the span of the file it wrote to, stored as the
+    zlib-compressed XOR of the old and new bytes there (bytes the edit left
+    alone are zeros and compress away), plus the part of the file past the
+    shorter of the two lengths. The same patch turns old into new and back.
+    The CRCs make sure an entry is only ever applied to the image it describes.
+    """
+    HEADER = struct.Struct('<IIIIIIIH')   # old_len, new_len, old_crc, new_crc, span start, span length, patch size, label length
+
+    __slots__ = ("label", "old_len", "new_len", "old_crc", "new_crc", "start", "length", "patch", "old_tail", "new_tail")
+
+    def __init__(self, label, old_len, new_len, old_crc, new_crc, start, length, patch, old_tail, new_tail):
+        self.label = label
+        self.old_len = old_len
+        self.new_len = new_len
+        self.old_crc = old_crc
+        self.new_crc = new_crc
+        self.start = start          # changed span: [start, start + length)
+        self.length = length
+        self.patch = patch          # zlib(old XOR new) over the span
+        self.old_tail = old_tail
+        self.new_tail = new_tail
+
+    @classmethod
+    def from_images(cls, old, new, label, written=None):
+        """
+        The entry for old -> new. 'written' are the [(offset, length), ...]
+        the edit wrote to (EbpFile.written_ranges()); they bound the span, which
+        is trusted once the bytes outside it compare equal. Without them (or if
+        they miss a change) the span comes from XOR-ing the whole common length.
+        """
+        common = min(len(old), len(new))
+        start = end = 0
+        if written is not None:
+            if written:
+                start = max(0, min(common, min(pos for pos, _ in written)))
+                end = max(start, min(common, max(pos + length for pos, length in written)))
+            if old[:start] != new[:start] or old[end:common] != new[end:common]:
+                written = None
+        if written is None:
+            delta = _xor_bytes(old[:common], new[:common])
+            trimmed = delta.lstrip(b"\x00")
+            start = common - len(trimmed)
+            end = start + len(trimmed.rstrip(b"\x00"))
+            delta = delta[start:end]
+        else:
+            delta = _xor_bytes(old[start:end], new[start:end])
+        return cls(label, len(old), len(new), zlib.crc32(old), zlib.crc32(new),
+                   start, end - start, zlib.compress(delta, 1) if delta else b"", bytes(old[common:]), bytes(new[common:]))
+
+    def apply(self, data, forward=True):
+        """Returns the image after redoing (forward) or undoing this entry on 'data'."""
+        expected_len, expected_crc = (self.old_len, self.old_crc) if forward else (self.new_len, self.new_crc)
+        if len(data) != expected_len or zlib.crc32(data) != expected_crc:
+            raise EbpError(f"File does not match the journal at '{self.label}' (edited outside the journal?).")
+        common = min(self.old_len, self.new_len)
+        result = bytearray(data[:common])
+        if self.length:
+            end = self.start + self.length
+            try:
+                delta = zlib.decompress(self.patch)
+            except zlib.error:
+                delta = b""
+            if len(delta) != self.length:
+                raise EbpError(f"Journal entry '{self.label}' is corrupt.")
+            result[self.start:end] = _xor_bytes(result[self.start:end], delta)
+        result += self.new_tail if forward else self.old_tail
+        return result
+
+    def pack(self):
+        label = self.label.encode("utf-8")
+        return b"".join([
+            self.HEADER.pack(self.old_len, self.new_len, self.old_crc, self.new_crc,
+                             self.start, self.length, len(self.patch), len(label)),
+            label, self.patch, self.old_tail, self.new_tail,
+        ])
+
+    @classmethod
+    def unpack_from(cls, buf, pos):
+        """Returns (entry, position after it)."""
+        old_len, new_len, old_crc, new_crc, start, length, patch_size, label_len = cls.HEADER.unpack_from(buf, pos)
+        pos += cls.HEADER.size
+        label = bytes(buf[pos:pos + label_len]).decode("utf-8")
+        pos += label_len
+        patch = bytes(buf[pos:pos + patch_size])
+        pos += patch_size
+        common = min(old_len, new_len)
+        old_tail = bytes(buf[pos:pos + old_len - common])
+        pos += old_len - common
+        new_tail = bytes(buf[pos:pos + new_len - common])
+        pos += new_len - common
+        return cls(label, old_len, new_len, old_crc, new_crc, start, length, patch, old_tail, new_tail), pos
+
+class EbpJournal:
+    """
+    Per-file edit history kept next to the map as <file>.journal.
+    
+    Each entry stores only what an edit changed (moved worker blocks,
+    pointer table, header fields, renumbered IDs, appended objects) as a
+    compressed XOR patch, so it costs far less than a copy of the map.
+    'cursor' counts the entries currently applied to the file: undo() steps
+    it back, redo() forward, and recording a new edit drops the redo tail.
+    """
+    HEADER = struct.Struct('<4sHI')   # magic, version, cursor
+
+    def __init__(self, file_path, metrics=None):
+        self.file_path = file_path
+        self.journal_path = file_path + JOURNAL_SUFFIX
+        self.entries = []
+        self.cursor = 0
+        metrics = metrics if metrics is not None else Metrics("journal", file=file_path)
+        if metered_call(metrics, os.path.exists, self.journal_path):
+            self._load(metrics)
+
+    def _load(self, metrics):
+        with MeteredFile.open(self.journal_path, 'rb', metrics) as f:
+            buf = f.read()
+        if len(buf) < self.HEADER.size:
+            raise EbpError(f"Journal is truncated: {self.journal_path}")
+        magic, version, cursor = self.HEADER.unpack_from(buf, 0)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            raise EbpError(f"Not a journal (or unsupported version): {self.journal_path}")
+        pos = self.HEADER.size
+        try:
+            while pos < len(buf):
+                entry, pos = JournalEntry.unpack_from(buf, pos)
+                self.entries.append(entry)
+        except (struct.error, UnicodeDecodeError, zlib.error):
+            raise EbpError(f"Journal is corrupt: {self.journal_path}")
+        self.cursor = min(cursor, len(self.entries))
+
+    def save(self, metrics=None):
+        parts = [self.HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, self.cursor)]
+        parts += [entry.pack() for entry in self.entries]
+        atomic_write(self.journal_path, b"".join(parts), metrics=metrics)
+
+    def record(self, old_data, new_data, label, ranges=None):
+        """
+        Adds the edit old_data -> new_data ('ranges': see JournalEntry.from_images).
+        If the file no longer matches the journal (changed by another tool),
+        the old history is dropped since it could not be undone anyway.
+        """
+        del self.entries[self.cursor:]
+        if self.entries and zlib.crc32(old_data) != self.entries[-1].new_crc:
+            self.entries.clear()
+        self.entries.append(JournalEntry.from_images(old_data, new_data, label, ranges))
+        self.cursor = len(self.entries)
+        return self.entries[-1]
+
+    def _step(self, forward):
+        if forward and self.cursor >= len(self.entries):
+            raise EbpError("Nothing to redo.")
+        if not forward and self.cursor == 0:
+            raise EbpError("Nothing to undo.")
+        entry = self.entries[self.cursor] if forward else self.entries[self.cursor - 1]
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+        atomic_write(self.file_path, entry.apply(data, forward))
+        self.cursor += 1 if forward else -1
+        self.save()
+        return entry
+
+    def undo(self):
+        """Reverts the last applied edit on disk and returns its entry."""
+        return self._step(forward=False)
+
+    def redo(self):
+        """Re-applies the next undone edit on disk and returns its entry."""
+        return self._step(forward=True)
+
+    def history(self):
+        """[(index, label, applied, journal bytes), ...] oldest first."""
+        return [
+            (i, entry.label, i < self.cursor, len(entry.pack()))
+            for i, entry in enumerate(self.entries)
+        ]
+
+def replay_journal(journal_source, target_path, count=None):
+    """
+    Re-applies the applied edits of another file's journal (or the first
+    'count' of them) to target_path, which must be a copy of the image the
+    journal started from. The target is written once, atomically, and the
+    replay is recorded in the target's own journal.
+    Returns the number of edits replayed.
+    """
+    journal = EbpJournal(journal_source)
+    entries = journal.entries[:journal.cursor if count is None else count]
+    with open(target_path, 'rb') as f:
+        original = f.read()
+    data = original
+    for entry in entries:
+        data = entry.apply(data, forward=True)
+    if entries:
+        write_journaled(target_path, original, data, f"replay {len(entries)} edit(s) from {os.path.basename(journal_source)}")
+    return len(entries)
+
+# ==================================================
+# COMMAND TABLE
+# ==================================================
+class CommandTable:
+    """
+    Everything derived from the command CSV, built once:
+    - command_map: {code: description} for the live annotation
+    - quick_input: {'labels': [...], 'map': {label: code}} for the quick input combos
+    - hex_codes: search codes for decoding, longest first
+    - opcode_trie / matcher: the compiled forms of the above
+    - version: checksum of the decoding codes, changes with the CSV
+    """
+    def __init__(self, rows=()):
+        self.command_map = {}
+        self.quick_input = {'labels': [], 'map': {}}
+        self.hex_codes = []
+        for row in rows:
+            if len(row) >= 2:
+                key = row[0].strip()
+                val = row[1].strip()
+                if key:
+                    self.command_map[key] = val
+            if len(row) >= 3:
+                code = row[2].strip().replace(" ", "").lower()
+                if code:
+                    self.hex_codes.append(code)
+            if len(row) >= 4:
+                code = row[2].strip()
+                label = row[3].strip()
+                if label:
+                    self.quick_input['labels'].append(label)
+                    self.quick_input['map'][label] = code
+        self.hex_codes.sort(key=len, reverse=True)
+        self.version = zlib.crc32("\n".join(self.hex_codes).encode("ascii", "replace"))
+        self.opcode_trie = build_opcode_trie(self.hex_codes)
+        self.matcher = CommandMatcher(self.command_map)
+
+def load_command_table(csv_path):
+    """Reads the command CSV. A missing file gives an empty table, read errors are raised."""
+    if not os.path.exists(csv_path):
+        return CommandTable()
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return CommandTable(csv.reader(f))
+
+# ==================================================
+# SCANNING
+# ==================================================
+def sized_object_size(code_len):
+    """Bytes taken by a sized object holding 'code_len' bytes of code."""
+    return OBJECT_CODE_START + (code_len + 3) // 4 * 4 + OBJECT_SIZED_FOOTER_SIZE
+
+def object_footer(data, obj_start, size):
+    """
+    (code end, footer ref position), both absolute, of the object of 'size'
+    bytes at obj_start. The signature tells the two layouts apart.
+    """
+    obj_end = obj_start + size
+    if data[obj_end - len(OBJECT_SIZED_SIGNATURE) : obj_end] == OBJECT_SIZED_SIGNATURE:
+        ref_pos = obj_end - OBJECT_SIZED_FOOTER_SIZE
+        code_len = struct.unpack_from('<I', data, ref_pos + 4)[0]
+        return obj_start + OBJECT_CODE_START + code_len, ref_pos
+    return obj_start + OBJECT_FOOTER_START, obj_start + OBJECT_FOOTER_START
+
+def _find_objects_in(data, base=0, seen_end=0):
+    """
+    Objects whose signature is in 'data' (found at file offset 'base') and
+    ends after file offset 'seen_end', as sorted (start, size) pairs.
+    """
+    objects = []
+    for signature in (OBJECT_SIGNATURE, OBJECT_SIZED_SIGNATURE):
+        sig_index = data.find(signature)
+        while sig_index != -1:
+            obj_end = base + sig_index + len(signature)
+            size = None
+            if obj_end <= seen_end:
+                pass
+            elif signature is OBJECT_SIGNATURE:
+                size = OBJECT_TOTAL_SIZE
+            elif sig_index >= 4:
+                size = sized_object_size(struct.unpack_from('<I', data, sig_index - 4)[0])
+            if size is not None and obj_end - size >= 0:
+                objects.append((obj_end - size, size))
+            sig_index = data.find(signature, sig_index + 1)
+    objects.sort()
+    return objects
+
+def find_objects(data):
+    """
+    (start, size) of every custom worker object in 'data' (bytes, bytearray
+    or mmap), in file order, found by the signature at the end of the
+    object footer: legacy 500-byte objects and sized ones alike.
+    """
+    return _find_objects_in(data)
+
+def iter_windows(f, overlap, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reads the open binary file 'f' from its current position in chunks of
+    'chunk_size' bytes. Each window is the last 'overlap' bytes of the
+    previous one followed by the new chunk, so a pattern of overlap + 1
+    bytes is never split. Only one window is held at a time.
+
+    :return: Iterator of (file offset of the window, window bytes)
+    """
+    base = f.tell()
+    window = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        tail = window[-overlap:] if overlap else b""
+        base += len(window) - len(tail)
+        window = tail + chunk
+        yield base, window
+
+def stream_objects(f, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    find_objects over an open binary file, read in chunks. Peak memory is
+    one chunk whatever the size of the file, so concatenated map dumps can
+    be scanned too.
+    """
+    # A signature and the code length before it are never split; matches
+    # that ended in the previous window are not counted twice
+    overlap = len(OBJECT_SIZED_SIGNATURE) + 3
+    objects = []
+    seen_end = 0
+    for base, window in iter_windows(f, overlap, chunk_size):
+        objects += _find_objects_in(window, base, seen_end)
+        seen_end = base + len(window)
+    return objects
+
+class ScanResult:
+    """
+    Custom worker objects found in a file by their footer signature.
+    The file stays memory-mapped while the result is open; each object is
+    handed out as a memoryview slice and only decoded when it is loaded.
+    Close it before the file is modified.
+
+    Files larger than STREAM_SCAN_THRESHOLD (or any file with
+    streaming=True) are scanned in chunks instead, and each object is read
+    from the file when it is requested.
+
+    from_ebp() scans an image that is already parsed for editing instead.
+    """
+    def __init__(self, filename, streaming=None):
+        self._file = open(filename, "rb")
+        self._mm = None
+        self._view = memoryview(b"")
+        self.objects = []
+        self.ebp = None
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            self.streaming = size > STREAM_SCAN_THRESHOLD if streaming is None else streaming
+            if self.streaming:
+                self.objects = stream_objects(self._file)
+            elif size > 0:
+                self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mm)
+                self.objects = find_objects(self._mm)
+        except Exception:
+            self.close()
+            raise
+        self.offsets = [offset for offset, _ in self.objects]
+
+    @classmethod
+    def from_ebp(cls, ebp):
+        """
+        The objects of a parsed EbpFile, which stays available as result.ebp:
+        each object is a view into ebp.data, so the file is neither read nor
+        parsed a second time. Close the result before editing ebp.
+        """
+        result = cls.__new__(cls)
+        result._file = None
+        result._mm = None
+        result._view = memoryview(ebp.data)
+        result.streaming = False
+        result.objects = ebp.objects()
+        result.offsets = [offset for offset, _ in result.objects]
+        result.ebp = ebp
+        return result
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, index):
+        offset, size = self.objects[index]
+        if self.streaming:
+            self._file.seek(offset)
+            return self._file.read(size)
+        return self._view[offset : offset + size]
+
+    def close(self):
+        self._view.release()
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass # An object view is still alive, the map closes once it is collected
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ==================================================
+# SCRIPT CODE
+# ==================================================
+def find_code_regions(data, worker_data_locs):
+    """
+    Returns the (start, end) byte ranges that hold script code:
+    - The main script, from the code start at 0x70 up to the next worker data
+      block, custom object or EOF, whichever comes first.
+    - The code area of every custom worker object appended by the editor.
+    """
+    objects = find_objects(data)
+    code_start = struct.unpack_from('<I', data, SCRIPT_HEADER_OFFSET)[0] + DATA_BASE
+    regions = _main_code_region(code_start, len(data), worker_data_locs, objects)
+    for obj_start, size in objects:
+        regions.append((obj_start + OBJECT_CODE_START, object_footer(data, obj_start, size)[0]))
+    return regions
+
+def _main_code_region(code_start, file_size, worker_data_locs, objects):
+    """[(code_start, end of the main script)], or [] if it is empty."""
+    code_end = file_size
+    for loc in list(worker_data_locs) + [obj_start for obj_start, _ in objects]:
+        if code_start <= loc < code_end:
+            code_end = loc
+    return [(code_start, code_end)] if code_start < code_end else []
+
+def stream_code_regions(f, worker_data_locs, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    find_code_regions over an open binary file: the objects come from
+    stream_objects and only each object is read back for its footer.
+    """
+    f.seek(0)
+    objects = stream_objects(f, chunk_size)
+    f.seek(SCRIPT_HEADER_OFFSET)
+    code_start = struct.unpack('<I', f.read(4))[0] + DATA_BASE
+    file_size = f.seek(0, 2)
+    regions = _main_code_region(code_start, file_size, worker_data_locs, objects)
+    for obj_start, size in objects:
+        f.seek(obj_start)
+        regions.append((obj_start + OBJECT_CODE_START, obj_start + object_footer(f.read(size), 0, size)[0]))
+    return regions
+
+def remap_worker_ids(buf, id_map, start, end, hits=None):
+    """
+    Decodes buf[start:end] instruction by instruction (opcodes >= 0x80 carry a
+    2-byte operand, the rest are single bytes) and rewrites every B3 operand
+    found in id_map. Works in place in a single pass. The position of every
+    rewritten operand is added to 'hits' if given.
+    
+    :return: Number of operands rewritten
+    """
+    return _remap_worker_ids(buf, id_map, start, min(end, len(buf)), hits)[0]
+
+# Possessive repeats (3.11+) keep re from stacking a backtrack point per instruction
+_REPEAT = rb"*+" if sys.version_info >= (3, 11) else rb"*"
+
+def _skip_pattern(id_map):
+    """
+    The decoder loop of remap_worker_ids as a regex: any run of instructions
+    except a B3 whose ID is in id_map, so Python only sees the hits.
+    """
+    low_bytes = {}
+    for old_id in id_map:
+        low_bytes.setdefault(old_id >> 8, []).append(old_id & 0xFF)
+    # One class of low bytes per high byte: IDs come in runs, so this stays short
+    mapped = b"|".join(
+        b"[" + b"".join(b"\\x%02x" % low for low in sorted(lows)) + b"]" + b"\\x%02x" % high
+        for high, lows in sorted(low_bytes.items())
+    )
+    return re.compile(rb"(?:[\x00-\x7f]|[\x80-\xb2\xb4-\xff]..|\xb3(?!" + mapped + rb")..)" + _REPEAT, re.DOTALL)
+
+def _remap_worker_ids(buf, id_map, start, end, hits=None):
+    """
+    remap_worker_ids over buf[start:end]. Returns (operands rewritten, cursor):
+    cursor is where decoding stopped, either 'end' or the start of an
+    instruction cut off by 'end'.
+    """
+    changed = 0
+    cursor = start
+    if not id_map:
+        return changed, end
+    skip = _skip_pattern(id_map)
+    while True:
+        cursor = skip.match(buf, cursor, end).end()
+        if cursor + 3 > end:
+            return changed, cursor
+        struct.pack_into('<H', buf, cursor + 1, id_map[buf[cursor + 1] | (buf[cursor + 2] << 8)])
+        changed += 1
+        if hits is not None:
+            hits.append(cursor + 1)
+        cursor += 3
+
+def stream_remap_worker_ids(f, id_map, regions, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    remap_worker_ids over the code 'regions' of the open file 'f' (opened
+    'r+b'), in place and in chunks. Each chunk is decoded from where the
+    previous one stopped, so an instruction cut by the chunk end is read
+    again whole with the next chunk and the result is the same as decoding
+    each region in one go. Peak memory is one chunk.
+
+    :return: Number of operands rewritten
+    """
+    if not id_map:
+        return 0
+    chunk_size = max(chunk_size, 3) # Room for a whole instruction
+    changed = 0
+    for start, end in regions:
+        cursor = start
+        while cursor < end:
+            f.seek(cursor)
+            buf = bytearray(f.read(min(chunk_size, end - cursor)))
+            count, stop = _remap_worker_ids(buf, id_map, 0, len(buf))
+            if count:
+                f.seek(cursor)
+                f.write(buf[:stop])
+                changed += count
+            if len(buf) < chunk_size:
+                break # Region (or file) ends in this chunk
+            cursor += stop
+    return changed
+
+# ==================================================
+# FREE SPACE AND COMPACTION
+# ==================================================
+class TailLayout:
+    """
+    What lives after the main script (the area the patcher and the editor
+    append to), found from the pointer table and the worker tables:
+    - tail_start: end of the main code region (see find_code_regions)
+    - block_users: {data block location: [worker IDs]} for blocks in the tail
+    - objects: every custom object in the tail; live_objects: the ones a worker uses
+    - object_sizes: {object location: size} for every object in the file
+    - items: [(location, size), ...] of the live blocks and objects, by location
+    
+    Raises EbpError when a worker's tables point into the tail but not into
+    a custom object, since that data cannot be accounted for.
+    """
+    def __init__(self, ebp):
+        data = ebp.data
+        worker_locs = [p + DATA_BASE for p in ebp.pointers]
+        self.object_sizes = dict(ebp.objects())
+        all_objects = list(self.object_sizes)
+
+        # Same boundary as the main code region of find_code_regions
+        self.tail_start = len(data)
+        for loc in worker_locs + all_objects:
+            if ebp.code_start <= loc < self.tail_start:
+                self.tail_start = loc
+
+        # Live blocks (shared blocks once) and the objects their tables point to
+        self.block_users = {}
+        for worker_id, loc in enumerate(worker_locs):
+            if loc >= self.tail_start:
+                self.block_users.setdefault(loc, []).append(worker_id)
+
+        self.objects = [obj for obj in all_objects if obj >= self.tail_start]
+        self.live_objects = set()
+        object_set = set(all_objects)
+        for loc in set(worker_locs):
+            if loc + WORKER_DATA_SIZE > len(data):
+                continue
+            entry_ptr, jump_ptr = struct.unpack_from('<II', data, loc + WORKER_TABLES_OFFSET)
+            for table_loc, obj_offset in ((entry_ptr + DATA_BASE, OBJECT_ENTRIES_START), (jump_ptr + DATA_BASE, OBJECT_JUMPS_START)):
+                if table_loc - obj_offset in object_set:
+                    self.live_objects.add(table_loc - obj_offset)
+                elif self.tail_start <= table_loc < len(data):
+                    raise EbpError(f"Worker data at 0x{loc:X} points to unknown data at 0x{table_loc:X}.")
+
+        self.items = sorted(
+            [(loc, WORKER_DATA_SIZE) for loc in self.block_users] +
+            [(obj, self.object_sizes[obj]) for obj in self.objects if obj in self.live_objects]
+        )
+        previous_end = self.tail_start
+        for loc, size in self.items:
+            if loc < previous_end:
+                raise EbpError(f"Data at 0x{loc:X} overlaps the previous block.")
+            previous_end = loc + size
+
+    def holes(self, file_size):
+        """[(start, size), ...] of the tail bytes no live block or object uses."""
+        holes = []
+        cursor = self.tail_start
+        for loc, size in self.items + [(file_size, 0)]:
+            if loc > cursor:
+                holes.append((cursor, loc - cursor))
+            cursor = max(cursor, loc + size)
+        return holes
+
+class FreeList:
+    """
+    Dead regions of an image as sorted [start, size] pairs.
+    allocate() carves a block out of them ("first" fit or "best" fit) so
+    new data fills holes before the file grows.
+    
+    A hole can be a dead object whose footer signature would still be
+    found after a smaller block is written over its start: for free lists
+    made by from_ebp, allocate() pads what the new block leaves of it.
+    """
+    def __init__(self, regions=(), fit="best"):
+        if fit not in ("first", "best"):
+            raise ValueError(f"Unknown fit: {fit}")
+        self.fit = fit
+        self.regions = sorted([start, size] for start, size in regions if size > 0)
+        self._ebp = None
+        self._signatures = []       # (start, end) of the dead objects' signatures
+
+    @classmethod
+    def from_ebp(cls, ebp, fit="best"):
+        """Holes in the tail of 'ebp'. Empty if the tail cannot be accounted for."""
+        try:
+            layout = TailLayout(ebp)
+        except EbpError:
+            return cls((), fit)
+        free_list = cls(layout.holes(len(ebp.data)), fit)
+        free_list._ebp = ebp
+        for obj in layout.objects:
+            if obj not in layout.live_objects:
+                obj_end = obj + layout.object_sizes[obj]
+                sized = ebp.data[obj_end - len(OBJECT_SIZED_SIGNATURE) : obj_end] == OBJECT_SIZED_SIGNATURE
+                free_list._signatures.append((obj_end - len(OBJECT_SIZED_SIGNATURE if sized else OBJECT_SIGNATURE), obj_end))
+        return free_list
+
+    def overlaps(self, start, end):
+        return any(region_start < end and start < region_start + size for region_start, size in self.regions)
+
+    def allocate(self, size):
+        """Start of a free range of 'size' bytes (now in use), or None."""
+        chosen = None
+        for index, (start, region_size) in enumerate(self.regions):
+            if region_size < size:
+                continue
+            if chosen is None or region_size < self.regions[chosen][1]:
+                chosen = index
+            if self.fit == "first" or region_size == size:
+                break
+        if chosen is None:
+            return None
+        start, region_size = self.regions[chosen]
+        if region_size == size:
+            del self.regions[chosen]
+        else:
+            self.regions[chosen] = [start + size, region_size - size]
+        for sig_start, sig_end in self._signatures:
+            pad_start, pad_end = max(sig_start, start + size), min(sig_end, start + region_size)
+            if pad_start < pad_end:
+                self._ebp.write_at(pad_start, bytes([OBJECT_PAD_BYTE]) * (pad_end - pad_start))
+        return start
+
+class CompactionReport:
+    """What compact() did to one image."""
+    __slots__ = ("size_before", "size_after", "blocks_moved", "objects_moved", "bytes_moved", "orphans_dropped")
+
+    def __init__(self, size_before):
+        self.size_before = size_before
+        self.size_after = size_before
+        self.blocks_moved = 0
+        self.objects_moved = 0
+        self.bytes_moved = 0
+        self.orphans_dropped = 0
+
+    @property
+    def bytes_reclaimed(self):
+        return self.size_before - self.size_after
+
+def _shift_object_pointers(buf, obj_start, size, delta):
+    """Moves a custom object's entry / jump pointers and footer ref by 'delta' bytes (0 = unused jump)."""
+    for pos in range(obj_start + OBJECT_ENTRIES_START, obj_start + OBJECT_CODE_START, 4):
+        val = struct.unpack_from('<I', buf, pos)[0]
+        if val or pos < obj_start + OBJECT_JUMPS_START:
+            struct.pack_into('<I', buf, pos, (val + delta) & 0xFFFFFFFF)
+    ref_pos = object_footer(buf, obj_start, size)[1]
+    struct.pack_into('<I', buf, ref_pos, (struct.unpack_from('<I', buf, ref_pos)[0] + delta) & 0xFFFFFFFF)
+
+def compact(ebp):
+    """
+    Repacks everything after the main script (worker data blocks moved to
+    EOF by the patcher, appended custom objects) densely, in its current
+    order, and rewrites every pointer to what moved:
+    - the worker pointer table
+    - the entry / jump table pointers of the workers using a moved object
+    - the entry / jump pointers and footer ref inside a moved object
+    Holes and custom objects no worker points to are dropped.
+    
+    Refuses (EbpError, see TailLayout) when the tail holds data it cannot
+    account for: that data must stay where it is.
+    
+    :return: CompactionReport
+    """
+    data = ebp.data
+    report = CompactionReport(len(data))
+    layout = TailLayout(ebp)
+    tail_start = layout.tail_start
+    block_users = layout.block_users
+    report.orphans_dropped = len(layout.objects) - len(layout.live_objects.intersection(layout.objects))
+
+    # New tail, built from the old bytes
+    new_tail = bytearray()
+    moved = {}
+    for old_loc, size in layout.items:
+        new_loc = tail_start + len(new_tail)
+        new_tail += data[old_loc : old_loc + size]
+        if new_loc == old_loc:
+            continue
+        moved[old_loc] = new_loc
+        report.bytes_moved += size
+        if old_loc in layout.object_sizes:
+            _shift_object_pointers(new_tail, new_loc - tail_start, size, new_loc - old_loc)
+            report.objects_moved += 1
+        else:
+            report.blocks_moved += 1
+
+    if not moved and tail_start + len(new_tail) == len(data):
+        return report
+
+    ebp.truncate(tail_start)
+    ebp.append(new_tail)
+    for old_loc, worker_ids in block_users.items():
+        if old_loc in moved:
+            for worker_id in worker_ids:
+                ebp.set_pointer(worker_id, moved[old_loc])
+
+    _repoint_object_tables(ebp, moved)
+    report.size_after = len(ebp.data)
+    return report
+
+def _repoint_object_tables(ebp, moved):
+    """Rewrites the entry / jump tables of the workers using an object in moved ({old: new location})."""
+    for loc in set(p + DATA_BASE for p in ebp.pointers):
+        if loc + WORKER_DATA_SIZE > len(ebp.data):
+            continue
+        entry_ptr, jump_ptr = struct.unpack_from('<II', ebp.data, loc + WORKER_TABLES_OFFSET)
+        obj = entry_ptr + DATA_BASE - OBJECT_ENTRIES_START
+        jump_obj = jump_ptr + DATA_BASE - OBJECT_JUMPS_START
+        if obj in moved or jump_obj in moved:
+            new_entry = moved[obj] - DATA_BASE + OBJECT_ENTRIES_START if obj in moved else entry_ptr
+            new_jump = moved[jump_obj] - DATA_BASE + OBJECT_JUMPS_START if jump_obj in moved else jump_ptr
+            ebp.set_worker_tables(loc, new_entry, new_jump)
+
+def replace_object(ebp, obj_start, new_object, free_list=None):
+    """
+    Puts 'new_object' (built for location obj_start, e.g. by
+    generate_relative_update_object) in place of the object at obj_start.
+    If it is larger than the old one it moves to a hole or EOF: its
+    pointers are shifted and the tables of the workers using it follow.
+    Whatever the old object leaves unused is overwritten with padding, so
+    no stale signature stays behind.
+
+    :return: Location of the new object
+    """
+    old_size = dict(ebp.objects()).get(obj_start)
+    if old_size is None:
+        raise EbpError(f"No custom worker object at 0x{obj_start:X}.")
+
+    new_loc = obj_start
+    if len(new_object) > old_size:
+        if free_list is None:
+            free_list = FreeList.from_ebp(ebp)
+        new_loc = free_list.allocate(len(new_object))
+        if new_loc is None:
+            new_loc = len(ebp.data)
+        new_object = bytearray(new_object)
+        _shift_object_pointers(new_object, 0, len(new_object), new_loc - obj_start)
+        ebp.write_at(obj_start, bytes([OBJECT_PAD_BYTE]) * old_size)
+        ebp.write_at(new_loc, new_object)
+        _repoint_object_tables(ebp, {obj_start: new_loc})
+    else:
+        ebp.write_at(obj_start, new_object)
+        ebp.write_at(obj_start + len(new_object), bytes([OBJECT_PAD_BYTE]) * (old_size - len(new_object)))
+    return new_loc
+
+# ==================================================
+# DECODING
+# ==================================================
+def build_opcode_trie(hex_codes):
+    """
+    Builds a byte-level trie from the CSV search codes (lowercase hex strings).
+    A node is a dict of {byte: child}; the None key marks the end of a code and
+    holds (hex_length, bytes_to_consume).
+    Odd-length codes match on a half byte, so they are expanded into every
+    possible last byte, but still only consume len // 2 bytes.
+    """
+    trie = {}
+    for code in hex_codes:
+        if len(code) % 2:
+            paths = [code + nibble for nibble in "0123456789abcdef"]
+        else:
+            paths = [code]
+        for path in paths:
+            try:
+                path_bytes = bytes.fromhex(path)
+            except ValueError:
+                break # Not hex, it can never match the decoded bytes
+            node = trie
+            for b in path_bytes:
+                node = node.setdefault(b, {})
+            terminal = (len(code), len(code) // 2)
+            # Longest code wins, first one in the list on a tie
+            if None not in node or node[None][0] < terminal[0]:
+                node[None] = terminal
+    return trie
+
+def match_opcode(trie, data, pos):
+    """Returns how many bytes the longest code starting at data[pos] consumes (0 = no match)."""
+    node = trie
+    best = 0
+    length = len(data)
+    while pos < length:
+        node = node.get(data[pos])
+        if node is None:
+            break
+        if None in node:
+            best = node[None][1]
+        pos += 1
+    return best
+
+class CommandMatcher:
+    """
+    The command table compiled once and shared by every row.
+    lookup() returns the description of the longest command found anywhere
+    in the text (first in the CSV on a tie), or "" if none is found.
+    """
+    def __init__(self, command_map):
+        # Rank = position in the longest-first order, same as the old per-row sort
+        self._ranked = {}
+        for key in sorted(command_map.keys(), key=len, reverse=True):
+            self._ranked.setdefault(key.lower(), (len(self._ranked), command_map[key]))
+        
+        # Lookahead so overlapping candidates are all seen; at each position the
+        # alternation order already picks the best ranked key.
+        if self._ranked:
+            pattern = "|".join(re.escape(key) for key in self._ranked)
+            self._regex = re.compile(f"(?=({pattern}))")
+        else:
+            self._regex = None
+
+    def lookup(self, text):
+        if self._regex is None:
+            return ""
+        best = None
+        for match in self._regex.finditer(text.lower()):
+            ranked = self._ranked[match.group(1)]
+            if best is None or ranked[0] < best[0]:
+                best = ranked
+        return best[1] if best else ""
+
+# ==================================================
+# EDITOR MODEL
+# ==================================================
+def empty_data_store(fields=FIELDS):
+    return {field: [{"c1": "", "text": ""} for _ in range(NUM_ROWS)] for field in fields}
+
+def load_worker_profile(file_path, fields=FIELDS):
+    """
+    Reads a worker profile JSON (a saved data_store). Missing pages and
+    row keys are added empty; anything that is not a data_store raises
+    ProfileError naming the profile.
+    """
+    name = os.path.basename(file_path)
+    with open(file_path, 'r') as f:
+        loaded_data = json.load(f)
+    if not isinstance(loaded_data, dict):
+        raise ProfileError(f"{name}: Invalid file format")
+    for field in fields:
+        rows = loaded_data.setdefault(field, [{"c1": "", "text": ""} for _ in range(NUM_ROWS)])
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ProfileError(f"{name}: Invalid rows for {field}")
+        for index, row in enumerate(rows):
+            for key in ("c1", "text"):
+                if not isinstance(row.setdefault(key, ""), str):
+                    raise ProfileError(f"{name}: {field} row {index + 1}: '{key}' must be a string, not {row[key]!r}")
+    return loaded_data
+
+def row_byte_length(text):
+    """Byte length of a CODE INPUT row (hex digits, spaces ignored, odd digit rounds up)."""
+    length = len(text.replace(" ", ""))
+    if length == 0:
+        return 0
+    return (length + 1) // 2
+
+class OffsetIndex:
+    """
+    Incrementally maintained byte offsets of every row of every page.
+    Keeps per-row lengths, per-page row prefix sums and page start offsets,
+    plus the rows carrying each jump tag, so an edit only touches the
+    offsets downstream of the changed row.
+    """
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self._lengths = {field: [] for field in self.fields}
+        self._tags = {field: [] for field in self.fields}
+        self._row_starts = {field: [0] for field in self.fields}
+        self._page_starts = [0] * (len(self.fields) + 1)
+        self._tag_rows = {f"j{i:02X}": set() for i in range(12)}
+
+    def load_store(self, data_store):
+        for field in self.fields:
+            self.load_field(field, data_store.get(field, []))
+
+    def load_field(self, field, rows):
+        """Replaces a whole page."""
+        f_idx = self._field_index[field]
+        for positions in self._tag_rows.values():
+            positions.difference_update([p for p in positions if p[0] == f_idx])
+
+        lengths = []
+        tags = []
+        row_starts = [0]
+        for i, row in enumerate(rows):
+            tag = row.get('c1', "")
+            length = row_byte_length(row.get('text', ""))
+            lengths.append(length)
+            tags.append(tag)
+            row_starts.append(row_starts[-1] + length)
+            if tag in self._tag_rows:
+                self._tag_rows[tag].add((f_idx, i))
+
+        self._lengths[field] = lengths
+        self._tags[field] = tags
+        self._row_starts[field] = row_starts
+        self._update_page_starts(f_idx)
+
+    def set_row(self, field, index, tag, text):
+        """
+        Updates one row. Returns True if its byte length changed, i.e. the
+        offsets of every following row moved.
+        """
+        f_idx = self._field_index[field]
+        lengths = self._lengths[field]
+        tags = self._tags[field]
+        while len(lengths) <= index:
+            lengths.append(0)
+            tags.append("")
+            self._row_starts[field].append(self._row_starts[field][-1])
+
+        old_tag = tags[index]
+        if old_tag != tag:
+            if old_tag in self._tag_rows:
+                self._tag_rows[old_tag].discard((f_idx, index))
+            if tag in self._tag_rows:
+                self._tag_rows[tag].add((f_idx, index))
+            tags[index] = tag
+
+        delta = row_byte_length(text) - lengths[index]
+        if delta == 0:
+            return False
+        lengths[index] += delta
+        row_starts = self._row_starts[field]
+        for i in range(index + 1, len(row_starts)):
+            row_starts[i] += delta
+        self._update_page_starts(f_idx)
+        return True
+
+    def _update_page_starts(self, from_index):
+        for i in range(from_index, len(self.fields)):
+            self._page_starts[i + 1] = self._page_starts[i] + self._row_starts[self.fields[i]][-1]
+
+    def page_start(self, field):
+        return self._page_starts[self._field_index[field]]
+
+    def row_offset(self, field, index):
+        row_starts = self._row_starts[field]
+        index = min(index, len(row_starts) - 1)
+        return self._page_starts[self._field_index[field]] + row_starts[index]
+
+    def entry_offsets(self):
+        return self._page_starts[:len(self.fields)]
+
+    def jump_offsets(self):
+        """{tag: offset of its first row in page order, or None}"""
+        jumps = {}
+        for tag, positions in self._tag_rows.items():
+            if positions:
+                f_idx, row_idx = min(positions)
+                jumps[tag] = self._page_starts[f_idx] + self._row_starts[self.fields[f_idx]][row_idx]
+            else:
+                jumps[tag] = None
+        return jumps
+
+# ==================================================
+# OBJECT GENERATION
+# ==================================================
+def _collect_code(data_store, fields, pointer_for):
+    """
+    Walks the pages in order and assembles the code.
+    pointer_for(relative_pos) turns a position inside the code into the
+    value stored in the entry / jump tables.
+    
+    :return: (entry values, jump values in j00..j0B order, code bytes)
+    """
+    entry_final_values = []
+    jump_final_values = {tag: None for tag in JUMP_TAGS}
+    all_code_bytes = bytearray()
+    current_relative_ptr = 0
+
+    for field in fields:
+        entry_final_values.append(pointer_for(current_relative_ptr))
+        for row in data_store[field]:
+            tag = row['c1']
+            if tag in jump_final_values and jump_final_values[tag] is None:
+                jump_final_values[tag] = pointer_for(current_relative_ptr)
+
+            txt = row['text'].replace(" ", "").strip()
+            if txt:
+                try:
+                    b_data = bytes.fromhex(txt)
+                except ValueError:
+                    raise HexError(f"Invalid Hex in {field}: {txt}")
+                all_code_bytes.extend(b_data)
+                current_relative_ptr += len(b_data)
+
+    # Fill missing jumps with 0
+    jumps = [jump_final_values[tag] or 0 for tag in JUMP_TAGS]
+    return entry_final_values, jumps, all_code_bytes
+
+def _build_object(entry_values, jump_values, code, footer_ref, legacy=False):
+    """
+    Lays out entries, jumps, code, footer reference and signature in a
+    padded object: a sized one just large enough for the code, or with
+    legacy=True a fixed 500-byte one.
+    """
+    code_len = len(code)
+    size = OBJECT_TOTAL_SIZE if legacy else sized_object_size(code_len)
+    buffer = bytearray(bytes([OBJECT_PAD_BYTE]) * size)
+
+    for i, val in enumerate(entry_values):
+        struct.pack_into('<I', buffer, OBJECT_ENTRIES_START + (i * 4), val)
+    for i, val in enumerate(jump_values):
+        struct.pack_into('<I', buffer, OBJECT_JUMPS_START + (i * 4), val)
+
+    max_code_space = OBJECT_FOOTER_START - OBJECT_CODE_START
+    if legacy and code_len > max_code_space:
+        raise ObjectOverflowError(f"Code is too long! ({code_len} bytes). Max is {max_code_space}.")
+    buffer[OBJECT_CODE_START : OBJECT_CODE_START + code_len] = code
+
+    if footer_ref is None:
+        footer_ref = struct.unpack_from('<I', buffer, OBJECT_ENTRIES_START)[0]
+    if legacy:
+        struct.pack_into('<I', buffer, OBJECT_FOOTER_START, footer_ref)
+        buffer[OBJECT_FOOTER_START + 4 : OBJECT_FOOTER_START + 16] = OBJECT_SIGNATURE
+    else:
+        struct.pack_into('<II', buffer, size - OBJECT_SIZED_FOOTER_SIZE, footer_ref, code_len)
+        buffer[size - len(OBJECT_SIZED_SIGNATURE):] = OBJECT_SIZED_SIGNATURE
+    return buffer
+
+def object_size(data_store, fields=FIELDS, legacy=False):
+    """Bytes the object built from data_store will take, wherever it is placed."""
+    if legacy:
+        return OBJECT_TOTAL_SIZE
+    return sized_object_size(len(_collect_code(data_store, fields, lambda relative_pos: 0)[2]))
+
+def generate_byte_object(data_store, base_offset, custom_entry_ptr, fields=FIELDS, legacy=False):
+    """
+    Builds a NEW object (uses the full formula).
+    
+    :param base_offset: Absolute start of the script code (value at 0x70 + 0x40)
+    :param custom_entry_ptr: Where the object will live, relative to 0x40
+    :param legacy: Build the fixed 500-byte layout instead of a sized object
+    """
+    def calculate_complex_pointer(relative_pos):
+        pos_in_obj = relative_pos + OBJECT_CODE_START
+        step_2 = pos_in_obj + custom_entry_ptr
+        step_3 = step_2 + 0x40
+        final_val = step_3 - base_offset
+        return final_val & 0xFFFFFFFF
+
+    entries, jumps, code = _collect_code(data_store, fields, calculate_complex_pointer)
+    # Footer reference = the INIT entry pointer
+    return _build_object(entries, jumps, code, None, legacy)
+
+def generate_relative_update_object(data_store, anchor_x, fields=FIELDS, legacy=False):
+    """
+    Builds the object where every pointer is (Anchor_X + Relative_Offset),
+    used to overwrite an object already in the file.
+    """
+    def relative_pointer(relative_pos):
+        return (anchor_x + relative_pos) & 0xFFFFFFFF
+
+    entries, jumps, code = _collect_code(data_store, fields, relative_pointer)
+    return _build_object(entries, jumps, code, anchor_x, legacy)
+
+# ==================================================
+# OBJECT DECODING
+# ==================================================
+def _group_hex(hex_raw):
+    """Cosmetic right-aligned 3-byte grouping: 'AABBCCDD' -> 'AA BBCCDD'."""
+    rev_hex = hex_raw[::-1]
+    chunks = [rev_hex[i:i+6] for i in range(0, len(rev_hex), 6)]
+    return " ".join(chunks)[::-1]
+
+def parse_chunk_to_rows(chunk, chunk_start_rel_offset, jump_map, opcode_trie, num_rows=NUM_ROWS):
+    """
+    Splits one page of code into editor rows: a new row starts at every jump
+    target and every command from the CSV gets a row of its own.
+    """
+    rows = []
+    cursor = 0
+    length = len(chunk)
+    current_row_bytes = bytearray()
+    current_row_tag = ""
+    
+    def flush_row():
+        nonlocal current_row_bytes, current_row_tag
+        # Only flush if we have content or a tag
+        if len(current_row_bytes) > 0 or current_row_tag:
+            hex_raw = current_row_bytes.hex().upper()
+            # Compress padding: runs of more than 10 "3C" become a single "3C"
+            hex_raw = re.sub(r'(3C){11,}', '3C', hex_raw)
+            rows.append({"c1": current_row_tag, "text": _group_hex(hex_raw)})
+        
+        current_row_bytes = bytearray()
+        current_row_tag = ""
+
+    while cursor < length:
+        # Absolute offset relative to code block start (80)
+        abs_offset_in_code = chunk_start_rel_offset + cursor
+        
+        # 1. Check if this is a Jump Target
+        if abs_offset_in_code in jump_map:
+            flush_row()
+            current_row_tag = jump_map[abs_offset_in_code]
+
+        # 2. Check for CSV Search Terms (longest match through the trie)
+        match_len_bytes = match_opcode(opcode_trie, chunk, cursor)
+        if match_len_bytes:
+            if len(current_row_bytes) > 0:
+                flush_row()
+            
+            cmd_bytes = chunk[cursor : cursor + match_len_bytes]
+            rows.append({"c1": current_row_tag, "text": _group_hex(cmd_bytes.hex().upper())})
+            current_row_tag = "" # Consumed
+            
+            cursor += match_len_bytes
+            continue
+
+        # 3. Just a normal byte
+        current_row_bytes.append(chunk[cursor])
+        cursor += 1
+    
+    # Flush leftovers
+    flush_row()
+    
+    # Pad with empty rows if needed
+    while len(rows) < num_rows:
+        rows.append({"c1": "", "text": ""})
+        
+    return rows[:num_rows]
+
+def decode_object(data_bytes, opcode_trie, fields=FIELDS):
+    """
+    Decodes a custom worker object (bytes or memoryview, sized or legacy
+    layout) back into a data_store: {field: [{"c1": tag, "text": hex}, ...]}.
+    """
+    code_end, ref_pos = object_footer(data_bytes, 0, len(data_bytes))
+    ref_ptr = struct.unpack_from('<I', data_bytes, ref_pos)[0]
+
+    entry_ptrs = struct.unpack_from('<8I', data_bytes, OBJECT_ENTRIES_START)
+    jump_ptrs = struct.unpack_from('<12I', data_bytes, OBJECT_JUMPS_START)
+
+    # Pointers are 32-bit: measure from the reference modulo 2**32, like they were built
+    rel_entries = [(val - ref_ptr) & 0xFFFFFFFF for val in entry_ptrs]
+    
+    rel_jumps = {}
+    for i, val in enumerate(jump_ptrs):
+        if val != 0:
+            rel_jumps[(val - ref_ptr) & 0xFFFFFFFF] = JUMP_TAGS[i]
+
+    full_code_block = data_bytes[OBJECT_CODE_START : code_end]
+    new_data_store = {}
+
+    for i, field in enumerate(fields):
+        start_offset = rel_entries[i]
+        if i < len(fields) - 1:
+            end_offset = rel_entries[i+1]
+        else:
+            end_offset = len(full_code_block)
+
+        if start_offset < 0 or start_offset >= len(full_code_block):
+            chunk = b""
+        else:
+            if end_offset > len(full_code_block):
+                end_offset = len(full_code_block)
+            if end_offset < start_offset:
+                end_offset = start_offset
+            chunk = full_code_block[start_offset : end_offset]
+
+        new_data_store[field] = parse_chunk_to_rows(chunk, start_offset, rel_jumps, opcode_trie)
+
+    return new_data_store
+
+def copy_data_store(data_store):
+    """A data_store whose rows can be edited without touching the original."""
+    return {field: [dict(row) for row in rows] for field, rows in data_store.items()}
+
+class DecodeCache:
+    """
+    LRU cache of decoded custom worker objects, keyed by a hash of the
+    object bytes plus the command table version (and the fields), so
+    selecting the same object again skips decode_object. Every call
+    returns its own copy of the data_store.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def decode(self, data_bytes, commands, fields=FIELDS):
+        key = (hashlib.blake2b(data_bytes, digest_size=16).digest(), commands.version, tuple(fields))
+        data_store = self._entries.get(key)
+        if data_store is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            data_store = decode_object(data_bytes, commands.opcode_trie, fields)
+            self._entries[key] = data_store
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return copy_data_store(data_store)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,634 @@
+"""
+Differential fuzzing for the EBP tools.
+
+Generates random valid maps (some with dead holes left by orphaned
+objects) and worker profiles and checks that the fast paths agree with
+the reference behaviour:
+- patch:     patch_ebp engine="stream" and engine="memory" against the
+             original engine="file", byte for byte (except the B3
+             look-alikes outside the script, which only the file engine
+             rewrites)
+- batch:     apply_clone_specs with several specs, private blocks and
+             every fit mode against a model of the result
+- tail:      compact and replace_object keep every worker's data, object
+             and the script, and leave a tail with no overlaps
+- roundtrip: generate object -> load_from_object -> update object gives
+             back the same object, legacy 500-byte and sized alike (new
+             and update objects)
+- parse:     the opcode trie page parser against the original
+             substring-search parser
+
+Any mismatch is shrunk to a minimal reproducer and printed as JSON.
+
+    python ebp_fuzz.py
+    python ebp_fuzz.py --cases 5000 --seed 7 --property patch
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+
+try:
+    from Worker_Data import ebp_core, ebp_patcher # Next to FFX_Worker_mod.py
+except ImportError:
+    import ebp_core                               # Run from the Worker_Data folder
+    import ebp_patcher
+
+from ebp_bench import load_bench_commands, make_synthetic_ebp, random_data_store
+
+# ==================================================
+# REFERENCE IMPLEMENTATIONS
+# ==================================================
+def reference_parse_chunk_to_rows(chunk, chunk_start_rel_offset, jump_map, hex_codes, num_rows=ebp_core.NUM_ROWS):
+    """The editor's original page parser: hex string prefix search, longest code first."""
+    rows = []
+    cursor = 0
+    length = len(chunk)
+    current_row_bytes = bytearray()
+    current_row_tag = ""
+
+    def flush_row():
+        nonlocal current_row_bytes, current_row_tag
+        if len(current_row_bytes) > 0 or current_row_tag:
+            hex_raw = current_row_bytes.hex().upper()
+            hex_raw = re.sub(r'(3C){11,}', '3C', hex_raw)
+            rev_hex = hex_raw[::-1]
+            chunks = [rev_hex[i:i+6] for i in range(0, len(rev_hex), 6)]
+            rows.append({"c1": current_row_tag, "text": " ".join(chunks)[::-1]})
+        current_row_bytes = bytearray()
+        current_row_tag = ""
+
+    while cursor < length:
+        abs_offset_in_code = chunk_start_rel_offset + cursor
+        if abs_offset_in_code in jump_map:
+            flush_row()
+            current_row_tag = jump_map[abs_offset_in_code]
+
+        match_found = False
+        remaining_bytes = chunk[cursor:]
+        remaining_hex = remaining_bytes.hex().lower()
+        for code in hex_codes:
+            if remaining_hex.startswith(code):
+                match_len_bytes = len(code) // 2
+                if len(current_row_bytes) > 0:
+                    flush_row()
+                rev_hex_cmd = remaining_bytes[:match_len_bytes].hex().upper()[::-1]
+                chunks_cmd = [rev_hex_cmd[i:i+6] for i in range(0, len(rev_hex_cmd), 6)]
+                rows.append({"c1": current_row_tag, "text": " ".join(chunks_cmd)[::-1]})
+                current_row_tag = ""
+                cursor += match_len_bytes
+                match_found = True
+                break
+        if match_found:
+            continue
+
+        current_row_bytes.append(chunk[cursor])
+        cursor += 1
+
+    flush_row()
+    while len(rows) < num_rows:
+        rows.append({"c1": "", "text": ""})
+    return rows[:num_rows]
+
+# ==================================================
+# PROPERTIES
+# ==================================================
+def _worker_id_opcodes(image):
+    """Positions of the complete B3 instructions, decoded the way Phase 5 does."""
+    positions = set()
+    for start, end in ebp_core.EbpFile(image).code_regions():
+        pos = start
+        while pos < end:
+            if image[pos] < 0x80:
+                pos += 1
+                continue
+            if image[pos] == ebp_core.OPCODE_WORKER_ID and pos + 3 <= end:
+                positions.add(pos)
+            pos += 3
+    return positions
+
+def _look_alike_difference(image, ref, new, n_clones):
+    """
+    None if ref (file engine) and new differ only by B3 look-alikes that
+    ref renumbered and new left alone (not a decoded instruction of
+    'image'), else a description of the difference.
+    """
+    if len(ref) == len(new) and ref != new:
+        opcodes = _worker_id_opcodes(image)
+        def look_alike(pos):
+            for start in (pos - 2, pos - 1, pos):
+                if start < 0 or start in opcodes or ref[start] != ebp_core.OPCODE_WORKER_ID or new[start] != ebp_core.OPCODE_WORKER_ID:
+                    continue
+                old_id, ref_id = struct.unpack_from('<H', new, start + 1)[0], struct.unpack_from('<H', ref, start + 1)[0]
+                if ref_id == old_id + n_clones:
+                    return True
+            return False
+        if all(look_alike(pos) for pos in range(len(ref)) if ref[pos] != new[pos]):
+            return None
+    return _describe_difference(ref, new)
+
+# Map cases shared by the properties that patch maps
+MAP_SIZES = ("workers", "subs", "code_size", "objects", "orphans", "gap", "tail")
+
+def _generate_map(rng):
+    workers = rng.randrange(1, 12)
+    objects = rng.randrange(0, 4) if workers > 1 else 0
+    return {
+        "seed": rng.randrange(1 << 30),
+        "workers": workers,
+        "subs": rng.randrange(0, 6),
+        "code_size": rng.randrange(0, 600),
+        "objects": objects,
+        "orphans": rng.randrange(0, objects + 1),
+        "gap": rng.choice((0, 0, 4, 8, 20, 60)),
+        "shuffle": rng.random() < 0.5,
+        "tail": rng.choice((0, 0, 16, 64)),
+    }
+
+def _build_map(case, commands):
+    return make_synthetic_ebp(case["workers"], case["subs"], case["code_size"], case["objects"], case["seed"],
+                              commands, case["gap"], case["shuffle"], case["tail"], case["orphans"])
+
+def _shrink_map(case, sizes=MAP_SIZES):
+    for key in sizes:
+        floor = 1 if key in ("workers", "n") else 0
+        for value in (floor, case[key] // 2, case[key] - 1):
+            if floor <= value < case[key]:
+                yield dict(case, **{key: value})
+    if case["shuffle"]:
+        yield dict(case, shuffle=False)
+
+def _worker_views(image, trie):
+    """
+    Per worker ID, its data block and the decoded object its tables point
+    to (None for script workers), which do not depend on where anything
+    sits in the file.
+    """
+    ebp = ebp_core.EbpFile(image)
+    objects = dict(ebp.objects())
+    views = []
+    for worker_id in range(ebp.total_workers):
+        loc = ebp.data_loc(worker_id)
+        block = bytes(image[loc : loc + ebp_core.WORKER_DATA_SIZE])
+        entry_ptr = struct.unpack_from('<I', block, ebp_core.WORKER_TABLES_OFFSET)[0]
+        obj = entry_ptr + ebp_core.DATA_BASE - ebp_core.OBJECT_ENTRIES_START
+        if obj in objects:
+            tables = slice(ebp_core.WORKER_TABLES_OFFSET, ebp_core.WORKER_TABLES_OFFSET + 8)
+            block = block[:tables.start] + block[tables.stop:]
+            views.append((block.hex(), ebp_core.decode_object(bytes(image[obj : obj + objects[obj]]), trie)))
+        else:
+            views.append((block.hex(), None))
+    return views
+
+def _main_script(image):
+    ebp = ebp_core.EbpFile(image)
+    return bytes(image[ebp.code_start : ebp_core.TailLayout(ebp).tail_start])
+
+def _compare_views(expected, actual):
+    if len(expected) != len(actual):
+        return f"{len(actual)} workers, expected {len(expected)}"
+    for worker_id, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            return f"worker {worker_id}: data or object differs from the model"
+    return None
+
+class PatchProperty:
+    """
+    patch_ebp: the stream and memory engines vs the file engine, on disk.
+    The file engine renumbers every B3 xx xx byte pattern in the file, the
+    others only real B3 instructions in the script. Differences that are
+    exactly such a look-alike (renumbered by the file engine only, not a
+    decoded instruction) are the intended fix and do not count.
+    The memory engine fills holes first, so on maps with orphaned objects
+    its layout is checked by the batch property instead.
+    """
+    name = "patch"
+    SIZES = MAP_SIZES + ("n",)
+    ENGINES = ("file", "stream", "memory")
+
+    def __init__(self, commands, workdir):
+        self.commands = commands
+        self.workdir = workdir
+
+    def generate(self, rng):
+        case = _generate_map(rng)
+        case.update(n=rng.randrange(1, 6), q=rng.randrange(0, case["workers"] + 6))
+        return case
+
+    def check(self, case):
+        image = _build_map(case, self.commands)
+        outputs = {}
+        for engine in self.ENGINES:
+            path = os.path.join(self.workdir, f"{engine}.ebp")
+            with open(path, 'wb') as f:
+                f.write(image)
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok = ebp_patcher.patch_ebp(path, case["n"], case["q"], engine=engine)
+            with open(path, 'rb') as f:
+                outputs[engine] = (ok, f.read())
+        ok_ref, ref = outputs["file"]
+        for engine in ("stream", "memory"):
+            ok_new, new = outputs[engine]
+            if ok_ref != ok_new:
+                return f"file engine returned {ok_ref}, {engine} engine {ok_new}"
+        failure = _look_alike_difference(image, ref, outputs["stream"][1], case["n"])
+        if failure:
+            return f"stream: {failure}"
+        if min(case["orphans"], case["objects"]) == 0:
+            failure = _describe_difference(outputs["stream"][1], outputs["memory"][1])
+            if failure:
+                return f"memory vs stream: {failure}"
+        return None
+
+    def shrink(self, case):
+        yield from _shrink_map(case, self.SIZES)
+        if case["q"] > 0:
+            yield dict(case, q=case["q"] - 1)
+
+class BatchProperty:
+    """
+    apply_clone_specs on maps with holes, with several specs, private or
+    shared blocks and every fit mode, against a model:
+    the header counts, each worker's data block and object (new workers
+    copy their Q, sub-routines move down), the script with every decoded
+    B3 instruction renumbered, and a tail whose live data does not overlap.
+    """
+    name = "batch"
+    FITS = (None, "first", "best")
+
+    def __init__(self, commands, workdir):
+        self.commands = commands
+
+    def generate(self, rng):
+        case = _generate_map(rng)
+        total = case["workers"] + case["subs"] + case["objects"]
+        case.update(
+            specs=[[rng.randrange(total), rng.randrange(1, 5)] for _ in range(rng.randrange(1, 4))],
+            private=rng.random() < 0.5,
+            fit=rng.choice(self.FITS),
+        )
+        return case
+
+    def check(self, case):
+        image = _build_map(case, self.commands)
+        trie = self.commands.opcode_trie
+        original = ebp_core.EbpFile(image)
+        total, nonsub = original.total_workers, original.nonsub_workers
+        specs = [(q, n) for q, n in case["specs"] if q < total]
+        if not specs:
+            return None
+        n_clones = sum(n for _, n in specs)
+
+        # Model: renumber the decoded B3 instructions of the original
+        model = bytearray(image)
+        id_map = {i: i + n_clones for i in range(nonsub, total + 1)}
+        for pos in _worker_id_opcodes(image):
+            new_id = id_map.get(struct.unpack_from('<H', model, pos + 1)[0])
+            if new_id is not None:
+                struct.pack_into('<H', model, pos + 1, new_id)
+        views = _worker_views(model, trie)
+        expected = views[:nonsub] + [views[q] for q, n in specs for _ in range(n)] + views[nonsub:]
+        header = bytearray(model[:ebp_core.POINTER_TABLE_START])
+        struct.pack_into('<HH', header, 0x74, total + n_clones, nonsub + n_clones)
+        header[0x52:0x58] = bytes(6)
+        header[0x5A:0x5E] = bytes(4)
+
+        ebp = ebp_core.EbpFile(bytearray(image))
+        clone_locs = ebp_patcher.apply_clone_specs(ebp, specs, case["private"], fit=case["fit"])
+        try:
+            ebp_core.TailLayout(ebp)
+        except ebp_core.EbpError as e:
+            return f"tail after the patch: {e}"
+        if bytes(ebp.data[:ebp_core.POINTER_TABLE_START]) != bytes(header):
+            return _describe_difference(bytes(header), bytes(ebp.data[:ebp_core.POINTER_TABLE_START]))
+        if _main_script(ebp.data) != _main_script(model):
+            return "script differs from the model"
+        failure = _compare_views(expected, _worker_views(ebp.data, trie))
+        if failure:
+            return failure
+
+        # Private clones get a block each, shared ones one block per spec
+        old_locs = {original.data_loc(worker_id) for worker_id in range(total)}
+        blocks, pos = [], 0
+        for _, n in specs:
+            spec_locs = set(clone_locs[pos : pos + n])
+            blocks += list(spec_locs)
+            pos += n
+            if len(spec_locs) != (n if case["private"] else 1):
+                return f"clone blocks {clone_locs} for specs {specs} (private={case['private']})"
+        if len(set(blocks)) != len(blocks):
+            return f"specs share clone blocks: {clone_locs}"
+        if old_locs.intersection(clone_locs):
+            return "a clone shares a block with an existing worker"
+        return None
+
+    def shrink(self, case):
+        yield from _shrink_map(case)
+        for index in range(len(case["specs"])):
+            if len(case["specs"]) > 1:
+                yield dict(case, specs=case["specs"][:index] + case["specs"][index + 1:])
+            q, n = case["specs"][index]
+            for smaller in ([q, 1], [0, n]):
+                if smaller != [q, n]:
+                    yield dict(case, specs=case["specs"][:index] + [smaller] + case["specs"][index + 1:])
+        if case["private"]:
+            yield dict(case, private=False)
+        if case["fit"] is not None:
+            yield dict(case, fit=None)
+
+class TailProperty:
+    """
+    compact and replace_object on maps with holes: every worker keeps its
+    data block and object, the script is untouched and the tail has no
+    overlaps. Compaction leaves no holes and drops exactly the orphans;
+    a replaced object stays in place when it fits and decodes to the new
+    profile for every worker using it.
+    """
+    name = "tail"
+
+    def __init__(self, commands, workdir):
+        self.commands = commands
+
+    def generate(self, rng):
+        case = _generate_map(rng)
+        case.update(
+            workers=max(case["workers"], 2),
+            objects=max(case["objects"], 1),
+            mode=rng.choice(("compact", "replace")),
+            index=rng.randrange(8),
+            store=random_data_store(rng, self.commands),
+            legacy=rng.random() < 0.3,
+        )
+        return case
+
+    def check(self, case):
+        image = _build_map(case, self.commands)
+        trie = self.commands.opcode_trie
+        ebp = ebp_core.EbpFile(bytearray(image))
+        before = _worker_views(image, trie)
+        script = _main_script(image)
+
+        if case["mode"] == "compact":
+            report = ebp_core.compact(ebp)
+            orphans = min(case["orphans"], case["objects"])
+            if report.orphans_dropped != orphans:
+                return f"dropped {report.orphans_dropped} orphaned object(s), expected {orphans}"
+            if len(ebp.data) > len(image):
+                return f"compaction grew the file: {len(image)} -> {len(ebp.data)}"
+            expected = before
+        else:
+            live = sorted(ebp_core.TailLayout(ebp).live_objects)
+            if not live:
+                return None
+            obj = live[case["index"] % len(live)]
+            old_size = dict(ebp.objects())[obj]
+            anchor = struct.unpack_from('<I', ebp.data, obj)[0]
+            try:
+                new_object = ebp_core.generate_relative_update_object(case["store"], anchor, legacy=case["legacy"])
+            except ebp_core.EbpError:
+                return None
+            new_loc = ebp_core.replace_object(ebp, obj, new_object)
+            if len(new_object) <= old_size and new_loc != obj:
+                return f"object of {len(new_object)} bytes moved out of its {old_size}-byte place"
+            new_view = ebp_core.decode_object(bytes(new_object), trie)
+            users = {worker_id for worker_id in range(ebp.total_workers)
+                     if struct.unpack_from('<I', image, ebp_core.EbpFile(image).data_loc(worker_id) + ebp_core.WORKER_TABLES_OFFSET)[0]
+                     == obj - ebp_core.DATA_BASE + ebp_core.OBJECT_ENTRIES_START}
+            expected = [(block, new_view) if worker_id in users else (block, view)
+                        for worker_id, (block, view) in enumerate(before)]
+
+        try:
+            layout = ebp_core.TailLayout(ebp)
+        except ebp_core.EbpError as e:
+            return f"tail after {case['mode']}: {e}"
+        if case["mode"] == "compact" and layout.holes(len(ebp.data)):
+            return f"holes left after compaction: {layout.holes(len(ebp.data))}"
+        if _main_script(ebp.data) != script:
+            return "script changed"
+        return _compare_views(expected, _worker_views(ebp.data, trie))
+
+    def shrink(self, case):
+        for smaller in _shrink_map(case):
+            if smaller["workers"] >= 2 and smaller["objects"] >= 1:
+                yield smaller
+        store = case["store"]
+        for field in ebp_core.FIELDS:
+            for index, row in enumerate(store[field]):
+                if row['text'] or row['c1']:
+                    smaller = copy.deepcopy(store)
+                    smaller[field][index] = {"c1": "", "text": ""}
+                    yield dict(case, store=smaller)
+        if case["legacy"]:
+            yield dict(case, legacy=False)
+
+    def describe(self, case):
+        return dict(case, store=_used_rows(case["store"]))
+
+class RoundTripProperty:
+    """Object generation -> decode -> relative update object."""
+    name = "roundtrip"
+
+    def __init__(self, commands, workdir):
+        self.commands = commands
+        self.choices = list(commands.quick_input['map'].values())
+
+    def generate(self, rng):
+        store = ebp_core.empty_data_store()
+        tags = list(ebp_core.JUMP_TAGS)
+        rng.shuffle(tags)
+        legacy = rng.random() < 0.5
+        budget = (ebp_core.OBJECT_FOOTER_START - ebp_core.OBJECT_CODE_START) // len(ebp_core.FIELDS)
+        if not legacy:
+            budget *= 4 # Sized objects have no upper limit
+        for field in ebp_core.FIELDS:
+            used = 0
+            for row in store[field][:rng.randrange(0, 12)]:
+                if self.choices and rng.random() < 0.6:
+                    text = rng.choice(self.choices)
+                else:
+                    # Raw bytes; 3C runs are the editor's padding and are not kept verbatim
+                    text = bytes(rng.choice([b for b in range(256) if b != ebp_core.OBJECT_PAD_BYTE])
+                                 for _ in range(rng.randrange(1, 5))).hex().upper()
+                length = ebp_core.row_byte_length(text)
+                if used + length > budget:
+                    break
+                used += length
+                row['text'] = text
+                if tags and rng.random() < 0.15:
+                    row['c1'] = tags.pop()
+        return {
+            "store": store,
+            "mode": rng.choice(("new", "update")),
+            "legacy": legacy,
+            "anchor": rng.randrange(1 << 32),
+            "base": rng.randrange(0x100, 1 << 20),
+        }
+
+    def check(self, case):
+        try:
+            if case["mode"] == "new":
+                obj = ebp_core.generate_byte_object(case["store"], case["base"], case["anchor"] & 0xFFFFF,
+                                                    legacy=case["legacy"])
+            else:
+                obj = ebp_core.generate_relative_update_object(case["store"], case["anchor"], legacy=case["legacy"])
+        except ebp_core.EbpError:
+            return None # Not a valid profile, nothing to compare
+        footer_ref = struct.unpack_from('<I', obj, ebp_core.object_footer(obj, 0, len(obj))[1])[0]
+        decoded = ebp_core.decode_object(bytes(obj), self.commands.opcode_trie)
+        again = ebp_core.generate_relative_update_object(decoded, footer_ref, legacy=case["legacy"])
+        return _describe_difference(bytes(obj), bytes(again))
+
+    def shrink(self, case):
+        store = case["store"]
+        for field in ebp_core.FIELDS:
+            for index, row in enumerate(store[field]):
+                if row['text'] or row['c1']:
+                    smaller = copy.deepcopy(store)
+                    smaller[field][index] = {"c1": "", "text": ""}
+                    yield dict(case, store=smaller)
+                if row['c1']:
+                    smaller = copy.deepcopy(store)
+                    smaller[field][index]['c1'] = ""
+                    yield dict(case, store=smaller)
+        if case["anchor"]:
+            yield dict(case, anchor=0)
+        if case["mode"] != "update":
+            yield dict(case, mode="update")
+        if case["legacy"]:
+            yield dict(case, legacy=False)
+
+    def describe(self, case):
+        return dict(case, store=_used_rows(case["store"]))
+
+class ParseProperty:
+    """Trie page parser vs the original substring-search parser."""
+    name = "parse"
+
+    def __init__(self, commands, workdir):
+        self.commands = commands
+        self.pieces = [bytes.fromhex(code) for code in commands.hex_codes if len(code) % 2 == 0]
+
+    def generate(self, rng):
+        chunk = bytearray()
+        for _ in range(rng.randrange(0, 60)):
+            if self.pieces and rng.random() < 0.5:
+                piece = rng.choice(self.pieces)
+                chunk += piece[:rng.randrange(1, len(piece) + 1)] # Whole codes and prefixes
+            else:
+                chunk.append(rng.choice((0x3C, 0xB3, 0xAE, 0xD8, 0x00, 0x01, rng.randrange(256))))
+        start = rng.randrange(0, 400)
+        jump_map = {start + rng.randrange(0, len(chunk) + 1): rng.choice(ebp_core.JUMP_TAGS)
+                    for _ in range(rng.randrange(0, 4))}
+        return {"chunk": chunk.hex(), "start": start, "jump_map": jump_map}
+
+    def check(self, case):
+        chunk = bytes.fromhex(case["chunk"])
+        ref = reference_parse_chunk_to_rows(chunk, case["start"], case["jump_map"], self.commands.hex_codes)
+        new = ebp_core.parse_chunk_to_rows(chunk, case["start"], case["jump_map"], self.commands.opcode_trie)
+        if ref != new:
+            first = next(i for i, (a, b) in enumerate(zip(ref, new)) if a != b)
+            return f"row {first}: reference {ref[first]} vs trie {new[first]}"
+        return None
+
+    def shrink(self, case):
+        chunk = bytes.fromhex(case["chunk"])
+        size = len(chunk) // 2
+        while size:
+            for pos in range(0, len(chunk), size):
+                yield dict(case, chunk=(chunk[:pos] + chunk[pos + size:]).hex())
+            size //= 2
+        for offset in case["jump_map"]:
+            yield dict(case, jump_map={k: v for k, v in case["jump_map"].items() if k != offset})
+
+PROPERTIES = (PatchProperty, BatchProperty, TailProperty, RoundTripProperty, ParseProperty)
+
+# ==================================================
+# DRIVER
+# ==================================================
+def _describe_difference(ref, new):
+    if ref == new:
+        return None
+    if len(ref) != len(new):
+        return f"size {len(ref)} (reference) vs {len(new)}"
+    first = next(i for i in range(len(ref)) if ref[i] != new[i])
+    return f"first difference at 0x{first:X}: {ref[first:first + 8].hex()} vs {new[first:first + 8].hex()}"
+
+def _used_rows(store):
+    """Only the used rows of a worker profile, keyed by row index (for reproducers)."""
+    store = {
+        field: {index: row for index, row in enumerate(rows) if row['text'] or row['c1']}
+        for field, rows in store.items()
+    }
+    return {field: rows for field, rows in store.items() if rows}
+
+def run_check(prop, case):
+    """prop.check(case), with a crash on either side reported as a failure."""
+    try:
+        return prop.check(case)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+def shrink_case(prop, case, failure):
+    """Greedy shrinking: keep the first smaller case that still fails until none does."""
+    progress = True
+    while progress:
+        progress = False
+        for candidate in prop.shrink(case):
+            result = run_check(prop, candidate)
+            if result:
+                case, failure, progress = candidate, result, True
+                break
+    return case, failure
+
+def run_fuzz(cases=500, seed=0, names=None, shrink=True):
+    """
+    Runs 'cases' random cases of every selected property.
+
+    :return: list of {'property', 'case', 'failure'} (shrunk), empty if all agree
+    """
+    commands = load_bench_commands()
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for prop_class in PROPERTIES:
+            if names and prop_class.name not in names:
+                continue
+            prop = prop_class(commands, workdir)
+            rng = random.Random(f"{seed}:{prop.name}")
+            for _ in range(cases):
+                case = prop.generate(rng)
+                failure = run_check(prop, case)
+                if failure:
+                    if shrink:
+                        case, failure = shrink_case(prop, case, failure)
+                    if hasattr(prop, "describe"):
+                        case = prop.describe(case)
+                    failures.append({'property': prop.name, 'case': case, 'failure': failure})
+                    break # One minimal reproducer per property is enough
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing of the EBP fast paths against the reference ones.")
+    parser.add_argument("--cases", type=int, default=500, help="Random cases per property (default 500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--property", action="append", choices=[p.name for p in PROPERTIES],
+                        help="Only run this property (repeatable)")
+    parser.add_argument("--no-shrink", action="store_true", help="Report the first failing case as generated")
+    args = parser.parse_args(argv)
+
+    failures = run_fuzz(args.cases, args.seed, args.property, not args.no_shrink)
+    for failure in failures:
+        print(f"[FAIL] {failure['property']}: {failure['failure']}")
+        print(json.dumps(failure['case'], indent=2, sort_keys=True))
+    checked = [p.name for p in PROPERTIES if not args.property or p.name in args.property]
+    print(f"--- {len(checked) - len(failures)} of {len(checked)} properties held over {args.cases} cases ---")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
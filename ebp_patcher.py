@@ -1,20 +1,34 @@
 import struct
 import os
+import sys
+import glob
 import shutil
-import tkinter as tk
+import argparse
+import bisect
+import contextlib
+import io
+import json
 import time
 
+try:
+    from . import ebp_core # Imported as Worker_Data.ebp_patcher
+except ImportError:
+    import ebp_core        # Run directly / from its own folder
+
 
 #import ebp_patcher # Import the file above
 
 ## Example: Adding 5 clones of Worker 2 to a specific file
 #ebp_patcher.patch_ebp("C:/Path/To/File.ebp", n_clones=5, q_source_id=2)
 
+## Command line: patch every map in a folder, 4 processes, 2 clones of Worker 1
+#python ebp_patcher.py "C:/Maps" --spec 1:2 --jobs 4
+
 
 
 
 # --- CONSTANTS ---
-WORKER_DATA_SIZE = 52 
+WORKER_DATA_SIZE = ebp_core.WORKER_DATA_SIZE
 # -----------------
 
 def get_path_from_clipboard():
@@ -23,6 +37,7 @@ def get_path_from_clipboard():
     (removes surrounding quotes common in Windows "Copy as Path").
     """
     try:
+        import tkinter as tk # Only needed here, keeps the patcher importable headless
         root = tk.Tk()
         root.withdraw()  # Hide the main window
         clip_text = root.clipboard_get()
@@ -35,13 +50,19 @@ def get_path_from_clipboard():
         print(f"Error reading clipboard: {e}")
         return None
 
-def patch_ebp(file_path, n_clones=1, q_source_id=1):
+def patch_ebp(file_path, n_clones=1, q_source_id=1, engine="memory"):
     """
     The core modular function.
     
     :param file_path: Absolute path to the .ebp file
     :param n_clones: Number of clones to add (N)
     :param q_source_id: The ID of the worker to duplicate data from (Q)
+    :param engine: "memory" reads the file once, patches it in a buffer and
+                   writes it back in one go. "file" is the original
+                   seek/read/write engine, kept as the reference.
+                   "stream" is the reference engine with Phase 5 done in
+                   chunks over the script code, for files too large to
+                   hold in memory.
     :return: Boolean (True if successful, False if failed)
     """
     
@@ -52,20 +73,391 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
         print(f"ERROR: File not found: {file_path}")
         return False
 
+    metrics = ebp_core.Metrics("patch", file=file_path, engine=engine, specs=[[q_source_id, n_clones]])
+    if engine in ("file", "stream"):
+        ok = _patch_ebp_file(file_path, n_clones, q_source_id, streaming=(engine == "stream"), metrics=metrics)
+    elif engine == "memory":
+        ok = _patch_ebp_memory(file_path, [(q_source_id, n_clones)], metrics=metrics)
+    else:
+        print(f"ERROR: Unknown engine: {engine}")
+        return False
+    metrics.finish(ok=ok)
+    return ok
+
+def patch_ebp_batch(file_path, specs, private_blocks=False):
+    """
+    Batch version of patch_ebp: clones several source workers in one patch.
+    
+    :param file_path: Absolute path to the .ebp file
+    :param specs: List of (source_id, count) tuples, e.g. [(1, 30), (4, 10)]
+    :param private_blocks: If True every clone gets its own copy of the
+                           52-byte data block instead of sharing one per spec
+    :return: Boolean (True if successful, False if failed)
+    """
+    
+    print(f"\n--- [MODULAR PATCHER] Processing: {os.path.basename(file_path)} ---")
+    print(f"    Target: {', '.join(f'N={n} from Q={q}' for q, n in specs)}")
+
+    if not os.path.exists(file_path):
+        print(f"ERROR: File not found: {file_path}")
+        return False
+
+    metrics = ebp_core.Metrics("patch", file=file_path, engine="memory", specs=[list(spec) for spec in specs])
+    ok = _patch_ebp_memory(file_path, specs, private_blocks, metrics)
+    metrics.finish(ok=ok)
+    return ok
+
+def _patch_ebp_memory(file_path, specs, private_blocks=False, metrics=None):
+    """
+    Memory engine driver: one read, patch in memory, then one atomic
+    replace of the file (the old version is kept as .bak without a copy).
+    The edit is recorded in <file>.journal, so it can be undone later.
+    Timings and counters go to 'metrics' (an ebp_core.Metrics) if given.
+    """
+    metrics = metrics if metrics is not None else ebp_core.Metrics("patch", file=file_path)
+
+    # 1. Read once
+    try:
+        with metrics.span("read"):
+            with ebp_core.MeteredFile.open(file_path, 'rb', metrics) as f:
+                original = f.read()
+    except IOError as e:
+        print(f"Error reading file: {e}")
+        return False
+
+    try:
+        ebp = ebp_core.EbpFile(bytearray(original))
+        apply_clone_specs(ebp, specs, private_blocks, metrics=metrics)
+    except (ValueError, ebp_core.EbpError) as e:
+        print(f"ERROR: {e}")
+        return False
+    except Exception as e:
+        print(f"CRITICAL ERROR: {e}")
+        return False
+
+    # 2. Backup + single atomic write + journal entry
+    label = "clone " + ", ".join(f"{q}:{n}" for q, n in specs) + (" (private)" if private_blocks else "")
+    try:
+        journaled = ebp_core.write_journaled(file_path, original, ebp.data, label, backup=True, metrics=metrics,
+                                             ranges=ebp.written_ranges())
+    except ebp_core.EbpError as e:
+        print(f"ERROR: {e}")
+        return False
+    except (IOError, OSError) as e:
+        print(f"CRITICAL ERROR: {e}")
+        return False
+    if not journaled:
+        print("WARNING: File updated, but its journal could not be saved.")
+
+    print("--- Success. File updated. ---")
+    return True
+
+def patch_buffer_batch(data, specs, private_blocks=False, metrics=None):
+    """
+    In-memory engine. Runs Phases 1-5 for every spec on a copy of 'data'
+    (the whole .ebp). See apply_clone_specs.
+    
+    :return: (patched bytearray, list of the data block location of each new worker)
+    Raises ValueError on invalid specs.
+    """
+    ebp = ebp_core.EbpFile(bytearray(data))
+    clone_locs = apply_clone_specs(ebp, specs, private_blocks, metrics=metrics)
+    return ebp.data, clone_locs
+
+def apply_clone_specs(ebp, specs, private_blocks=False, fit="best", metrics=None):
+    """
+    Adds sum(count) workers for the (source_id, count) specs to a parsed
+    EbpFile, in place, with a single gap calculation and one pointer-table
+    shift. Moved and new data blocks fill holes after the script where
+    'fit' allows it; whatever does not fit is appended at EOF in one run.
+    
+    New workers take IDs old_nonsub .. old_nonsub + N - 1, in spec order.
+    
+    :param fit: "best" or "first": moved and new data blocks first go into
+                holes after the script (ebp_core.FreeList), only the rest is
+                appended. None always appends.
+    :param metrics: ebp_core.Metrics that gets one span per phase and the
+                    workers_evicted / bytes_moved / bytes_appended /
+                    ids_renumbered counters
+    :return: List of the data block location of each new worker
+    Raises ValueError on invalid specs.
+    """
+    # ===========================================================
+    # PHASE 1: MAPPING AND GAP CALCULATION (PHYSICAL SORT)
+    # ===========================================================
+    
+    metrics = metrics if metrics is not None else ebp_core.Metrics("apply_clone_specs")
+    metrics.phase("mapping")
+    old_total_workers = ebp.total_workers
+    old_nonsub_workers = ebp.nonsub_workers
+
+    if not specs:
+        raise ValueError("No clone specs given.")
+    if old_nonsub_workers > old_total_workers:
+        raise ValueError(f"Header lists {old_nonsub_workers} non-sub workers out of {old_total_workers}.")
+    for q_source_id, count in specs:
+        if not 0 <= q_source_id < old_total_workers:
+            raise ValueError(f"Source Q ({q_source_id}) out of bounds.")
+        if count < 1:
+            raise ValueError(f"Clone count for Q ({q_source_id}) must be at least 1.")
+    n_clones = sum(count for _, count in specs)
+
+    # Define the "Growing Edge" (End of Pointer Table)
+    ptr_table_end = ebp.pointer_table_end
+
+    # Code is located on the untouched layout, everything below only appends
+    # at EOF, fills dead holes or writes inside the header/pointer table.
+    code_regions = ebp.code_regions()
+    free_list = ebp_core.FreeList.from_ebp(ebp, fit) if fit else None
+    if free_list is not None and free_list.regions:
+        # Orphaned objects are holes now: their code is dead, leave it alone
+        code_regions = [r for r in code_regions if not free_list.overlaps(*r)]
+
+    # Sort by physical location to find blocking data: one sort of the
+    # pointer table (worker IDs ordered by their block, ties by ID)
+    pointers = ebp.pointers
+    physical_order = sorted(range(old_total_workers), key=pointers.__getitem__)
+    sorted_locs = [pointers[worker_id] + ebp_core.DATA_BASE for worker_id in physical_order]
+
+    # Gap Check (what is left of the last evicted block stays free for the next adds)
+    bytes_needed = n_clones * 4
+    
+    metrics.phase("gap eviction")
+    # Every block that starts inside the room the table needs is in the way:
+    # that is a prefix of the physical order, found by bisection
+    n_victims = bisect.bisect_left(sorted_locs, ptr_table_end + bytes_needed)
+    victims = physical_order[:n_victims]
+
+    # Move the obstacles to holes or, as one run, to EOF
+    current_eof = len(ebp.data)
+    victim_locs = []
+    evicted = bytearray()
+    for victim_id, victim_loc in zip(victims, sorted_locs):
+        victim_data = ebp.data[victim_loc : victim_loc + WORKER_DATA_SIZE]
+        victim_data += bytes(WORKER_DATA_SIZE - len(victim_data))
+        new_loc = free_list.allocate(WORKER_DATA_SIZE) if free_list is not None else None
+        if new_loc is None:
+            new_loc = current_eof + len(evicted)
+            evicted += victim_data
+        else:
+            ebp.write_at(new_loc, victim_data)
+        victim_locs.append(new_loc)
+    ebp.append(evicted)
+    ebp.set_pointers(victims, victim_locs)
+    metrics.count("workers_evicted", n_victims)
+    metrics.count("bytes_moved", n_victims * WORKER_DATA_SIZE)
+
+    # ===========================================================
+    # PHASE 2: APPEND TEMPLATES (From each Source Q)
+    # ===========================================================
+    
+    # Read fresh pointers for every Q (in case they moved). Blocks that do
+    # not fit in a hole are appended as one contiguous run at EOF.
+    metrics.phase("template append")
+    current_eof = len(ebp.data)
+    clone_locs = []
+    appended = bytearray()
+    for q_source_id, count in specs:
+        template_data = ebp.worker_block(q_source_id)
+        template_data += bytes(WORKER_DATA_SIZE - len(template_data))
+        
+        for _ in range(count if private_blocks else 1):
+            block_loc = free_list.allocate(WORKER_DATA_SIZE) if free_list is not None else None
+            if block_loc is None:
+                block_loc = current_eof + len(appended)
+                appended += template_data
+            else:
+                ebp.write_at(block_loc, template_data)
+            clone_locs.extend([block_loc] * (1 if private_blocks else count))
+    
+    ebp.append(appended)
+    metrics.count("bytes_appended", len(appended))
+
+    # ===========================================================
+    # PHASE 3: INJECT POINTERS
+    # ===========================================================
+    
+    # Sub-routine pointers shift down, new pointers go in front of them
+    metrics.phase("pointer injection")
+    ebp.insert_pointers(old_nonsub_workers, clone_locs)
+    metrics.count("bytes_moved", (old_total_workers - old_nonsub_workers) * 4)
+
+    # ===========================================================
+    # PHASE 4: UPDATE HEADERS
+    # ===========================================================
+    
+    metrics.phase("header update")
+    ebp.set_worker_counts(old_total_workers + n_clones, old_nonsub_workers + n_clones)
+    
+    # Zeroing
+    ebp.write_at(0x52, b'\x00\x00\x00\x00')
+    ebp.write_at(0x56, b'\x00\x00')
+    ebp.write_at(0x5A, b'\x00\x00\x00\x00')
+
+    # ===========================================================
+    # PHASE 5: ID REPLACEMENT
+    # ===========================================================
+    
+    # Every ID from the first sub-routine up shifts by N (same range as the
+    # reference engine). Only B3 operands inside code are touched.
+    metrics.phase("id replacement")
+    id_map = {i: i + n_clones for i in range(old_nonsub_workers, old_total_workers + 1)}
+    for start, end in code_regions:
+        metrics.count("ids_renumbered", ebp.remap_worker_ids(id_map, start, end))
+    metrics.phase(None)
+
+    return clone_locs
+
+def add_custom_workers(ebp, data_stores, q_source_id=1, fields=ebp_core.FIELDS, metrics=None):
+    """
+    Adds one custom worker per data_store to a parsed EbpFile, in place.
+    One patch reserves every pointer slot (each worker gets its own data
+    block cloned from Q), then every object location, entry and jump
+    pointer is known up front: objects go into holes where they fit and
+    the rest is appended as one run.
+    
+    :return: List of (data block location, object location) per worker
+    Raises ValueError on an invalid Q, HexError on an invalid profile.
+    """
+    if not data_stores:
+        raise ValueError("No worker profiles given.")
+    metrics = metrics if metrics is not None else ebp_core.Metrics("add_custom_workers")
+    clone_locs = apply_clone_specs(ebp, [(q_source_id, len(data_stores))], private_blocks=True, metrics=metrics)
+
+    metrics.phase("object generation")
+    free_list = ebp_core.FreeList.from_ebp(ebp)
+    current_eof = len(ebp.data)
+    placed = []
+    appended = bytearray()
+    for clone_loc, data_store in zip(clone_locs, data_stores):
+        object_loc = free_list.allocate(ebp_core.object_size(data_store, fields))
+        at_eof = object_loc is None
+        if at_eof:
+            object_loc = current_eof + len(appended)
+        entry_val = object_loc - ebp_core.DATA_BASE
+        final_object = ebp_core.generate_byte_object(data_store, ebp.code_start, entry_val, fields)
+        if at_eof:
+            appended += final_object
+        else:
+            ebp.write_at(object_loc, final_object)
+        placed.append((clone_loc, object_loc))
+
+    # Entry / jump table pointers in each new data block
+    metrics.phase("footer update")
+    for clone_loc, object_loc in placed:
+        entry_val = object_loc - ebp_core.DATA_BASE
+        ebp.set_worker_tables(clone_loc, entry_val, entry_val + ebp_core.OBJECT_JUMPS_START)
+
+    metrics.phase("object append")
+    ebp.append(appended)
+    metrics.count("bytes_appended", len(appended))
+    metrics.phase(None)
+    return placed
+
+def add_workers_from_profiles(file_path, profile_paths, q_source_id=1):
+    """
+    Bulk version of the editor's "ADD WORKER TO EBP": one custom worker per
+    profile JSON, all added in one patch and one atomic, journaled write.
+    
+    :param file_path: Absolute path to the .ebp file
+    :param profile_paths: Worker profile JSON files (see collect_profile_files)
+    :return: Boolean (True if successful, False if failed)
+    """
+    print(f"\n--- [MODULAR PATCHER] Processing: {os.path.basename(file_path)} ---")
+    print(f"    Target: {len(profile_paths)} custom worker(s) from Q={q_source_id}")
+
+    if not os.path.exists(file_path):
+        print(f"ERROR: File not found: {file_path}")
+        return False
+
+    # Every profile is checked before the map is touched
+    data_stores = []
+    for path in profile_paths:
+        try:
+            data_store = ebp_core.load_worker_profile(path)
+            ebp_core.object_size(data_store)
+        except ebp_core.ProfileError as e:
+            print(f"ERROR: {e}")
+            return False
+        except (IOError, ValueError, ebp_core.EbpError) as e:
+            print(f"ERROR: {os.path.basename(path)}: {e}")
+            return False
+        data_stores.append(data_store)
+
+    metrics = ebp_core.Metrics("add custom workers", file=file_path, profiles=len(profile_paths))
+    try:
+        with ebp_core.EbpTransaction(file_path, label=f"add {len(data_stores)} custom worker(s)", metrics=metrics) as txn:
+            for clone_loc, object_loc in add_custom_workers(txn.ebp, data_stores, q_source_id, metrics=metrics):
+                print(f"    Worker data 0x{clone_loc:X} -> object 0x{object_loc:X}")
+    except (IOError, OSError, ValueError, ebp_core.EbpError) as e:
+        print(f"ERROR: {e}")
+        metrics.finish(ok=False)
+        return False
+
+    metrics.finish(ok=True)
+    print("--- Success. File updated. ---")
+    return True
+
+def compact_ebp(file_path):
+    """
+    Repacks the relocated worker data blocks and custom objects at the end
+    of the file densely (see ebp_core.compact) in one atomic, journaled write.
+    
+    :param file_path: Absolute path to the .ebp file
+    :return: Bytes reclaimed, or None if it failed
+    """
+    
+    print(f"\n--- [COMPACTION] Processing: {os.path.basename(file_path)} ---")
+
+    if not os.path.exists(file_path):
+        print(f"ERROR: File not found: {file_path}")
+        return None
+
+    metrics = ebp_core.Metrics("compact", file=file_path)
+    try:
+        with ebp_core.EbpTransaction(file_path, label="compact", metrics=metrics) as txn:
+            metrics.phase("compaction")
+            report = ebp_core.compact(txn.ebp)
+            metrics.count("bytes_moved", report.bytes_moved)
+            if not report.bytes_reclaimed and not (report.blocks_moved or report.objects_moved):
+                txn.abort()
+    except (IOError, OSError, ebp_core.EbpError) as e:
+        print(f"ERROR: {e}")
+        metrics.finish(ok=False)
+        return None
+    metrics.finish(ok=True, bytes_reclaimed=report.bytes_reclaimed)
+
+    print(f"    Moved {report.blocks_moved} worker block(s) and {report.objects_moved} object(s), "
+          f"dropped {report.orphans_dropped} orphaned object(s).")
+    print(f"--- {report.size_before} -> {report.size_after} bytes ({report.bytes_reclaimed} reclaimed) ---")
+    return report.bytes_reclaimed
+
+def _patch_ebp_file(file_path, n_clones, q_source_id, streaming=False, metrics=None):
+    """
+    Reference engine: patches the file in place through seek/read/write.
+    With streaming=True Phase 5 decodes the script code chunk by chunk
+    instead of loading the whole file (see ebp_core.stream_remap_worker_ids)
+    and, like the memory engine, only renumbers real B3 instructions.
+    Same phases and counters as the memory engine on 'metrics' if given.
+    """
+    metrics = metrics if metrics is not None else ebp_core.Metrics("patch", file=file_path)
+
     # 1. Backup
     backup_path = file_path + ".bak"
     try:
-        shutil.copy(file_path, backup_path)
+        with metrics.span("backup"):
+            ebp_core.metered_call(metrics, shutil.copy, file_path, backup_path)
     except IOError as e:
         print(f"Error creating backup: {e}")
         return False
 
     try:
-        with open(file_path, 'r+b') as f:
+        with ebp_core.MeteredFile.open(file_path, 'r+b', metrics) as f:
             # ===========================================================
             # PHASE 1: MAPPING AND GAP CALCULATION (PHYSICAL SORT)
             # ===========================================================
             
+            metrics.phase("mapping")
             f.seek(0, 2)
             original_file_size = f.tell()
             current_eof = original_file_size
@@ -96,12 +488,19 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
                     'data_loc': data_loc
                 })
 
+            # Code is located before anything moves (everything below only
+            # appends at EOF or writes inside the header/pointer table)
+            if streaming:
+                code_regions = ebp_core.stream_code_regions(f, [w['data_loc'] for w in worker_locations])
+
             # Sort by physical location to find blocking data
             worker_locations.sort(key=lambda x: x['data_loc'])
 
             # Gap Check Loop
             bytes_needed = n_clones * 4
             
+            metrics.phase("gap eviction")
+            n_evicted = 0
             while True:
                 # Get the worker physically closest to the pointer table
                 if not worker_locations:
@@ -132,12 +531,16 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
                 f.write(struct.pack('<I', new_ptr_val))
                 
                 current_eof += WORKER_DATA_SIZE
+                n_evicted += 1
+            metrics.count("workers_evicted", n_evicted)
+            metrics.count("bytes_moved", n_evicted * WORKER_DATA_SIZE)
 
             # ===========================================================
             # PHASE 2: APPEND TEMPLATE (From Source Q)
             # ===========================================================
             
             # Read fresh pointer for Q (in case it moved)
+            metrics.phase("template append")
             f.seek(0x78 + (q_source_id * 4))
             template_ptr_val = struct.unpack('<I', f.read(4))[0]
             
@@ -149,6 +552,7 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
             f.seek(clone_data_loc)
             f.write(template_data)
             current_eof += WORKER_DATA_SIZE
+            metrics.count("bytes_appended", WORKER_DATA_SIZE)
             
             new_clones_ptr_target = clone_data_loc - 0x40
 
@@ -156,6 +560,7 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
             # PHASE 3: INJECT POINTERS
             # ===========================================================
             
+            metrics.phase("pointer injection")
             offset_insertion = 0x78 + (old_nonsub_workers * 4)
             offset_old_table_end = 0x78 + (old_total_workers * 4)
             
@@ -166,6 +571,7 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
                 sub_routine_ptrs = f.read(size_to_shift)
                 f.seek(offset_insertion + (n_clones * 4))
                 f.write(sub_routine_ptrs)
+                metrics.count("bytes_moved", size_to_shift)
 
             # Write New Pointers
             f.seek(offset_insertion)
@@ -177,6 +583,7 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
             # PHASE 4: UPDATE HEADERS
             # ===========================================================
             
+            metrics.phase("header update")
             f.seek(0x74)
             f.write(struct.pack('<H', old_total_workers + n_clones))
             f.seek(0x76)
@@ -194,7 +601,16 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
         # PHASE 5: ID REPLACEMENT
         # ===========================================================
         
-        with open(file_path, 'rb') as f:
+        metrics.phase("id replacement")
+        if streaming:
+            id_map = {i: i + n_clones for i in range(old_nonsub_workers, old_total_workers + 1)}
+            with ebp_core.MeteredFile.open(file_path, 'r+b', metrics) as f:
+                metrics.count("ids_renumbered", ebp_core.stream_remap_worker_ids(f, id_map, code_regions))
+            metrics.phase(None)
+            print("--- Success. File updated. ---")
+            return True
+
+        with ebp_core.MeteredFile.open(file_path, 'rb', metrics) as f:
             content = bytearray(f.read())
             
         start_id = old_total_workers
@@ -204,11 +620,15 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
             pattern_old = b'\xB3' + struct.pack('<H', i)
             pattern_new = b'\xB3' + struct.pack('<H', i + n_clones)
             
-            if pattern_old in content:
+            hits = content.count(pattern_old)
+            if hits:
                 content = content.replace(pattern_old, pattern_new)
+                metrics.count("ids_renumbered", hits)
                 
-        with open(file_path, 'wb') as f:
+        metrics.phase("write")
+        with ebp_core.MeteredFile.open(file_path, 'wb', metrics) as f:
             f.write(content)
+        metrics.phase(None)
 
         print("--- Success. File updated. ---")
         return True
@@ -217,10 +637,204 @@ def patch_ebp(file_path, n_clones=1, q_source_id=1):
         print(f"CRITICAL ERROR: {e}")
         return False
 
+# ==================================================
+# BATCH COMMAND LINE
+# ==================================================
+def parse_spec(text):
+    """'Q:N' -> (Q, N). A bare 'Q' means one clone."""
+    q_text, _, n_text = text.partition(":")
+    try:
+        spec = (int(q_text, 0), int(n_text, 0) if n_text else 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid spec '{text}', expected Q:N")
+    if spec[1] < 1:
+        raise argparse.ArgumentTypeError(f"Invalid spec '{text}', N must be at least 1")
+    return spec
+
+def collect_ebp_files(targets, recursive=False):
+    """
+    Expands files, directories (every *.ebp inside) and glob patterns into a
+    sorted list of unique file paths.
+    """
+    found = set()
+    for target in targets:
+        if os.path.isdir(target):
+            pattern = os.path.join(target, "**", "*.ebp") if recursive else os.path.join(target, "*.ebp")
+            found.update(glob.glob(pattern, recursive=recursive))
+        elif glob.has_magic(target):
+            found.update(p for p in glob.glob(target, recursive=recursive) if os.path.isfile(p))
+        else:
+            found.add(target)
+    return sorted(found)
+
+def collect_profile_files(targets):
+    """Expands worker profile files and folders (every *.json inside) into a sorted list."""
+    found = set()
+    for target in targets:
+        if os.path.isdir(target):
+            found.update(glob.glob(os.path.join(target, "*.json")))
+        else:
+            found.add(target)
+    return sorted(found)
+
+def _batch_job(job):
+    """Process pool entry point. Patches one file and returns its summary."""
+    file_path, specs, private_blocks = job
+    log = io.StringIO()
+    start = time.perf_counter()
+    size_before = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    metrics = ebp_core.Metrics("patch", file=file_path, engine="memory", specs=[list(spec) for spec in specs])
+    with contextlib.redirect_stdout(log):
+        if not os.path.exists(file_path):
+            print(f"ERROR: File not found: {file_path}")
+            ok = False
+        else:
+            ok = _patch_ebp_memory(file_path, specs, private_blocks, metrics)
+    metrics.finish(ok=ok)
+    elapsed = time.perf_counter() - start
+    size_after = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    return {
+        'path': file_path,
+        'ok': ok,
+        'seconds': elapsed,
+        'size_before': size_before,
+        'size_after': size_after,
+        'log': log.getvalue(),
+        'metrics': metrics.to_dict(),
+    }
+
+def _journal_command(files, action, count):
+    """--undo / --redo / --history on every file, in order."""
+    failed = 0
+    for path in files:
+        try:
+            journal = ebp_core.EbpJournal(path)
+            if action == "history":
+                print(f"{path}:")
+                if not journal.entries:
+                    print("    (no journal)")
+                for index, label, applied, size in journal.history():
+                    print(f"  {'*' if applied else ' '} {index:3d}  {label}  ({size} bytes)")
+                continue
+            for _ in range(count):
+                entry = journal.undo() if action == "undo" else journal.redo()
+                print(f"  [{action.upper()}] {path}: {entry.label}")
+        except (OSError, ebp_core.EbpError) as e:
+            failed += 1
+            print(f"  [FAIL] {path}: {e}")
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Clone workers into every .ebp file found in the given files, folders or glob patterns."
+    )
+    parser.add_argument("targets", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument("--spec", action="append", type=parse_spec, metavar="Q:N",
+                        help="Add N clones of worker Q (repeatable, default 1:1)")
+    parser.add_argument("--private", action="store_true",
+                        help="Give every clone its own data block")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="Search directories recursively")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print the patcher log of every file")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write per-phase timings and counters of every file as JSON ('-' for stdout)")
+    journal_group = parser.add_mutually_exclusive_group()
+    journal_group.add_argument("--compact", action="store_true",
+                               help="Repack relocated worker data and custom objects instead of patching")
+    journal_group.add_argument("--undo", type=int, nargs="?", const=1, metavar="STEPS",
+                               help="Undo the last journaled edit(s) instead of patching")
+    journal_group.add_argument("--redo", type=int, nargs="?", const=1, metavar="STEPS",
+                               help="Redo undone edit(s) instead of patching")
+    journal_group.add_argument("--history", action="store_true",
+                               help="List the journaled edits of each file")
+    journal_group.add_argument("--replay", metavar="EBP",
+                               help="Replay the journaled edits of EBP onto the targets")
+    journal_group.add_argument("--add-workers", action="append", metavar="PROFILES",
+                               help="Add one custom worker per profile JSON (file or folder, repeatable) "
+                                    "instead of cloning")
+    args = parser.parse_args(argv)
+
+    specs = args.spec or [(1, 1)]
+    files = collect_ebp_files(args.targets, args.recursive)
+    if not files:
+        print("No .ebp files found.")
+        return 1
+
+    if args.compact:
+        results = [compact_ebp(path) for path in files]
+        reclaimed = sum(r for r in results if r)
+        failed = results.count(None)
+        print(f"--- {len(results) - failed} compacted, {failed} failed, {reclaimed} bytes reclaimed ---")
+        return 1 if failed else 0
+    if args.history:
+        return _journal_command(files, "history", 0)
+    if args.undo is not None:
+        return _journal_command(files, "undo", args.undo)
+    if args.redo is not None:
+        return _journal_command(files, "redo", args.redo)
+    if args.replay:
+        failed = 0
+        for path in files:
+            try:
+                replayed = ebp_core.replay_journal(args.replay, path)
+                print(f"  [OK  ] {path}: {replayed} edit(s) replayed")
+            except (OSError, ebp_core.EbpError) as e:
+                failed += 1
+                print(f"  [FAIL] {path}: {e}")
+        return 1 if failed else 0
+    if args.add_workers:
+        profiles = collect_profile_files(args.add_workers)
+        if not profiles:
+            print("No worker profiles found.")
+            return 1
+        results = [add_workers_from_profiles(path, profiles) for path in files]
+        print(f"--- {results.count(True)} updated, {results.count(False)} failed ---")
+        return 0 if all(results) else 1
+
+    jobs = [(path, specs, args.private) for path in files]
+    print(f"Patching {len(files)} file(s) with {max(1, args.jobs)} process(es)...")
+
+    batch_start = time.perf_counter()
+    if args.jobs <= 1 or len(jobs) == 1:
+        results = [_batch_job(job) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_batch_job, jobs))
+    batch_elapsed = time.perf_counter() - batch_start
+
+    failed = 0
+    for result in results:
+        status = "OK  " if result['ok'] else "FAIL"
+        failed += not result['ok']
+        print(f"  [{status}] {result['path']}  "
+              f"{result['size_before']} -> {result['size_after']} bytes  "
+              f"{result['seconds'] * 1000:.1f} ms")
+        if args.verbose or not result['ok']:
+            for line in result['log'].strip().splitlines():
+                print(f"         {line}")
+
+    print(f"--- {len(results) - failed} patched, {failed} failed in {batch_elapsed:.2f} s ---")
+
+    if args.metrics:
+        report = json.dumps([result['metrics'] for result in results], indent=2)
+        if args.metrics == "-":
+            print(report)
+        else:
+            with open(args.metrics, 'w') as f:
+                f.write(report)
+    return 1 if failed else 0
+
 # ==================================================
 # EXECUTION BLOCK (Runs only if file is run directly)
 # ==================================================
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+
     print("Reading file path from clipboard...")
     target_path = get_path_from_clipboard()
     